@@ -0,0 +1,35 @@
+"""adding scanner replicas
+
+Revision ID: a8e3d51f7c96
+Revises: f1c6d8b3e502
+Create Date: 2026-10-17 21:05:12.384519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e3d51f7c96'
+down_revision: Union[str, None] = 'f1c6d8b3e502'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scanner_replicas',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scanner_replicas_heartbeat_expires_at'), 'scanner_replicas', ['heartbeat_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scanner_replicas_heartbeat_expires_at'), table_name='scanner_replicas')
+    op.drop_table('scanner_replicas')
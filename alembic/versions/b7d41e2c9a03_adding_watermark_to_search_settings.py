@@ -0,0 +1,30 @@
+"""adding watermark to search settings
+
+Revision ID: b7d41e2c9a03
+Revises: 51be5ea962eb
+Create Date: 2026-10-17 09:12:41.502318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41e2c9a03'
+down_revision: Union[str, None] = '51be5ea962eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('search_settings', sa.Column('last_seen_ad_id', sa.String(), nullable=True))
+    op.add_column('search_settings', sa.Column('last_seen_ad_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('search_settings', 'last_seen_ad_at')
+    op.drop_column('search_settings', 'last_seen_ad_id')
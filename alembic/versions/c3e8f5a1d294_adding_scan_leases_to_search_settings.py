@@ -0,0 +1,32 @@
+"""adding scan leases to search settings
+
+Revision ID: c3e8f5a1d294
+Revises: b7d41e2c9a03
+Create Date: 2026-10-17 14:03:27.918204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f5a1d294'
+down_revision: Union[str, None] = 'b7d41e2c9a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('search_settings', sa.Column('leased_by', sa.String(), nullable=True))
+    op.add_column('search_settings', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_search_settings_leased_by'), 'search_settings', ['leased_by'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_search_settings_leased_by'), table_name='search_settings')
+    op.drop_column('search_settings', 'lease_expires_at')
+    op.drop_column('search_settings', 'leased_by')
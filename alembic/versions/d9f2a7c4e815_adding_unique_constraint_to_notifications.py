@@ -0,0 +1,48 @@
+"""adding unique constraint to notifications
+
+Revision ID: d9f2a7c4e815
+Revises: c3e8f5a1d294
+Create Date: 2026-10-17 16:21:08.533710
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f2a7c4e815'
+down_revision: Union[str, None] = 'c3e8f5a1d294'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Remove duplicates left by concurrent scans, keeping a sent notification if there is one
+    op.execute(
+        """
+        DELETE FROM notifications
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY item_id, user_id, search_id
+                    ORDER BY is_sent DESC NULLS LAST, created_at, id
+                ) AS position
+                FROM notifications
+            ) AS ranked
+            WHERE position > 1
+        )
+        """
+    )
+    op.create_unique_constraint(
+        'uq_notifications_item_id_user_id_search_id',
+        'notifications',
+        ['item_id', 'user_id', 'search_id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_notifications_item_id_user_id_search_id', 'notifications', type_='unique')
@@ -0,0 +1,32 @@
+"""adding content hash to items
+
+Revision ID: e4b7c2d9a361
+Revises: d9f2a7c4e815
+Create Date: 2026-10-17 17:48:52.104387
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7c2d9a361'
+down_revision: Union[str, None] = 'd9f2a7c4e815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored generated column, filling it rewrites the items table once
+    op.add_column(
+        'items',
+        sa.Column('content_hash', sa.String(), sa.Computed('md5(raw_data::text)', persisted=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('items', 'content_hash')
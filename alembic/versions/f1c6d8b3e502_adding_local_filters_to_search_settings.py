@@ -0,0 +1,34 @@
+"""adding local filters to search settings
+
+Revision ID: f1c6d8b3e502
+Revises: e4b7c2d9a361
+Create Date: 2026-10-17 19:12:40.657118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6d8b3e502'
+down_revision: Union[str, None] = 'e4b7c2d9a361'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('search_settings', sa.Column('required_keywords', sa.String(), nullable=True))
+    op.add_column('search_settings', sa.Column('excluded_keywords', sa.String(), nullable=True))
+    op.add_column('search_settings', sa.Column('title_pattern', sa.String(), nullable=True))
+    op.add_column('search_settings', sa.Column('max_ad_age_hours', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('search_settings', 'max_ad_age_hours')
+    op.drop_column('search_settings', 'title_pattern')
+    op.drop_column('search_settings', 'excluded_keywords')
+    op.drop_column('search_settings', 'required_keywords')
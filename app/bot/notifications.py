@@ -13,6 +13,6 @@ async def send_item_notifications(bot: Bot):
     try:
         logger.info("Sending item notifications")
         await notification_service.send_pending_notifications(bot)
-        logger.info("Notifications sent successfully")
+        logger.info(f"Notifications sent successfully, stats: {notification_service.get_stats()}")
     except Exception as e:
         logger.error(f"Error sending notifications: {e}")
\ No newline at end of file
@@ -3,7 +3,7 @@ from aiogram.types import Message
 from loguru import logger
 import re
 
-from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient
+from app.services.item_detail_service import item_detail_service
 from app.builders.message_builder import SingleKleinanzeigenItemMessageBuilder
 
 link_router = Router()
@@ -22,9 +22,7 @@ async def handle_kleinanzeigen_link(message: Message):
     item_id = item_id_match.group(1)
     logger.info(f"Extracted item ID: {item_id} from URL: {url}")
     
-    kleinanzeigen_client = KleinanzeigenClient.get_instance()
-
-    item_data = await kleinanzeigen_client.fetch_one_item(item_id)
+    item_data = await item_detail_service.get_item(item_id)
 
     if item_data is None:
         await message.answer("Sorry, I couldn't fetch the item details.")
@@ -15,6 +15,7 @@ from app.bot.keyboards import (
 from app.bot.routers.states import AddSearchStates
 from app.db.database import async_session
 from app.services import SearchSettingsService
+from app.services.search_filter import compile_title_pattern, split_keyword_input
 
 search_create_router = Router()
 
@@ -26,6 +27,9 @@ test_map = {
         "highest_price": "Change highest price",
         "location": "Change location",
         "radius": "Change radius",
+        "keywords": "Change keywords",
+        "title_pattern": "Change title pattern",
+        "max_ad_age": "Change max ad age",
     },
     "prompt": {
         "alias": "🔍 Enter search alias:",
@@ -34,6 +38,9 @@ test_map = {
         "highest_price": "💸 Enter new highest price:",
         "location": "📍 Enter location (city or postal code):",
         "radius": "📏 Enter search radius in km:",
+        "keywords": "🔑 Enter comma separated keywords the ad must contain, prefix keywords to exclude with '-' ('-' alone clears them):",
+        "title_pattern": "🧩 Enter a regular expression the ad title must match ('-' clears it):",
+        "max_ad_age": "⏱️ Enter the maximum age of ads in hours (0 for any age):",
     },
     "state": {
         "alias": AddSearchStates.waiting_for_search_name,
@@ -42,6 +49,9 @@ test_map = {
         "highest_price": AddSearchStates.waiting_for_highest_price,
         "location": AddSearchStates.waiting_for_location,
         "radius": AddSearchStates.waiting_for_radius,
+        "keywords": AddSearchStates.waiting_for_keywords,
+        "title_pattern": AddSearchStates.waiting_for_title_pattern,
+        "max_ad_age": AddSearchStates.waiting_for_max_ad_age,
     }
 }
 
@@ -60,6 +70,10 @@ async def confirmation_message(state: FSMContext, user_id: int):
     ad_type = data.get("ad_type")
     poster_type = data.get("poster_type")
     is_picture_required = data.get("is_picture_required")
+    required_keywords = data.get("required_keywords")
+    excluded_keywords = data.get("excluded_keywords")
+    title_pattern = data.get("title_pattern")
+    max_ad_age_hours = data.get("max_ad_age_hours")
 
     async with async_session() as session:
         user_service = UserService(session)
@@ -79,6 +93,10 @@ async def confirmation_message(state: FSMContext, user_id: int):
 🔖 *Ad type:* _{ad_type.value.capitalize() if ad_type else "Any"}_
 👤 *Poster type:* _{poster_type.value.capitalize() if poster_type else "Any"}_
 📷 *Photos required:* {"✅ Yes" if is_picture_required else "❌ No"}
+
+🔑 *Keywords:* `{required_keywords or "-"}`, excluded: `{excluded_keywords or "-"}`
+🧩 *Title pattern:* `{title_pattern or "-"}`
+⏱️ *Max ad age:* {f"{max_ad_age_hours} h" if max_ad_age_hours else "Any"}
 """
 
 
@@ -236,6 +254,56 @@ async def process_highest_price(message: Message, state: FSMContext):
 
 
 
+@search_create_router.message(AddSearchStates.waiting_for_keywords)
+async def process_keywords(message: Message, state: FSMContext):
+    """Process keywords for new search."""
+    if not message.text:
+        await message.answer("Please enter valid keywords.")
+        return
+
+    required_keywords, excluded_keywords = split_keyword_input(message.text)
+    await state.update_data(required_keywords=required_keywords or None, excluded_keywords=excluded_keywords or None)
+    await state.set_state(AddSearchStates.hold)
+    text, keyboard = await confirmation_message(state, message.from_user.id)
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+
+@search_create_router.message(AddSearchStates.waiting_for_title_pattern)
+async def process_title_pattern(message: Message, state: FSMContext):
+    """Process title pattern for new search."""
+    pattern = (message.text or "").strip()
+    if pattern == "-":
+        pattern = None
+    else:
+        try:
+            compile_title_pattern(pattern)
+        except ValueError as e:
+            await message.answer(f"Please enter another pattern: {e}.")
+            return
+
+    await state.update_data(title_pattern=pattern or None)
+    await state.set_state(AddSearchStates.hold)
+    text, keyboard = await confirmation_message(state, message.from_user.id)
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+
+@search_create_router.message(AddSearchStates.waiting_for_max_ad_age)
+async def process_max_ad_age(message: Message, state: FSMContext):
+    """Process maximum ad age for new search."""
+    try:
+        max_ad_age_hours = int((message.text or "").strip())
+        if max_ad_age_hours < 0:
+            raise ValueError("Age must be positive")
+    except ValueError:
+        await message.answer("Please enter a valid number of hours.")
+        return
+
+    await state.update_data(max_ad_age_hours=max_ad_age_hours or None)
+    await state.set_state(AddSearchStates.hold)
+    text, keyboard = await confirmation_message(state, message.from_user.id)
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+
 @search_create_router.callback_query(F.data == "add_search_confirm", AddSearchStates.hold)
 async def confirm_add_search(callback: CallbackQuery, state: FSMContext):
     """Handle confirmation of new search addition."""
@@ -271,7 +339,11 @@ async def confirm_add_search(callback: CallbackQuery, state: FSMContext):
             radius_km=radius_km,
             ad_type=ad_type,
             poster_type=poster_type,
-            is_picture_required=is_picture_required
+            is_picture_required=is_picture_required,
+            required_keywords=data.get("required_keywords"),
+            excluded_keywords=data.get("excluded_keywords"),
+            title_pattern=data.get("title_pattern"),
+            max_ad_age_hours=data.get("max_ad_age_hours"),
         )
 
         search_settings_service = SearchSettingsService(session)
@@ -12,6 +12,9 @@ class AddSearchStates(StatesGroup):
     waiting_for_search_name = State()
     waiting_for_lowest_price = State()
     waiting_for_highest_price = State()
+    waiting_for_keywords = State()
+    waiting_for_title_pattern = State()
+    waiting_for_max_ad_age = State()
 
 class EditSearchStates(StatesGroup):
     """States for editing an existing search."""
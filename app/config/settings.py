@@ -21,11 +21,16 @@ class Settings(BaseSettings):
     # Bot settings
     BOT_TOKEN: str
     ADMIN_USER_IDS: List[int]
+    TELEGRAM_API_URL: Optional[str] = None  # e.g. a local Bot API server
     
     # Kleinanzeigen settings
     KLEINANZEIGEN_API_URL: str = "https://www.kleinanzeigen.de"
     KLEINANZEIGEN_AUTH_TOKEN: str = None
     REQUEST_INTERVAL: int = 30  # seconds
+    ADAPTIVE_POLLING: bool = True
+    STAGGERED_SCANS: bool = True
+    MIN_REQUEST_INTERVAL: int = 10  # seconds
+    MAX_REQUEST_INTERVAL: int = 900  # seconds
     NOTIFICATION_INTERVAL: int = 60  # seconds
     
     # Logging
@@ -42,6 +47,44 @@ class Settings(BaseSettings):
     # Scan settings
     KLEINANZEIGEN_CONCURRENT_REQUESTS_FOR_SCAN: int = 5
     KLEINANZEIGEN_MAX_ITEMS_PER_PAGE: int = 10
+    KLEINANZEIGEN_MIN_ITEMS_PER_PAGE: int = 3
+    KLEINANZEIGEN_MAX_CATCH_UP_PAGES: int = 5
+    KLEINANZEIGEN_MERGE_SEARCHES: bool = True
+    SCAN_MODE: str = "search"  # search or firehose
+    FIREHOSE_MAX_ITEMS_PER_PAGE: int = 100
+    KLEINANZEIGEN_JSON_DECODER: str = "auto"  # auto, orjson or json
+    KLEINANZEIGEN_STREAM_ADS: bool = True
+    KLEINANZEIGEN_SCAN_PROFILE: str = "scan"  # scan or full
+    KLEINANZEIGEN_LOCATION_CACHE_TTL: int = 86400  # seconds
+    KLEINANZEIGEN_LOCATION_CACHE_SIZE: int = 1000
+    KLEINANZEIGEN_ITEM_DETAIL_CACHE_TTL: int = 300  # seconds
+    KLEINANZEIGEN_ITEM_DETAIL_CACHE_SIZE: int = 1000
+    SEEN_AD_CACHE_SIZE: int = 200_000  # (search, ad) pairs, 0 disables the cache
+
+    SEARCH_REGISTRY_RESYNC_INTERVAL: int = 600  # seconds
+
+    # Parsing executor settings
+    PARSING_EXECUTOR: str = "inline"  # inline or process
+    PARSING_WORKERS: int = 0  # 0 uses all available cores
+    PARSING_MIN_BATCH_SIZE: int = 5
+
+    # Scanner replica settings
+    EMBEDDED_SCANNER: bool = True
+    SCANNER_LEASING: bool = False
+    SCANNER_ID: Optional[str] = None  # defaults to <hostname>-<pid>
+    SCANNER_LEASE_TTL: int = 120  # seconds
+
+    # HTTP connection pool settings
+    KLEINANZEIGEN_CONNECTION_LIMIT: int = 100
+    KLEINANZEIGEN_CONNECTION_LIMIT_PER_HOST: int = 20
+    KLEINANZEIGEN_DNS_CACHE_TTL: int = 300  # seconds
+    KLEINANZEIGEN_KEEPALIVE_TIMEOUT: int = 60  # seconds
+
+    # Rate limiter settings
+    KLEINANZEIGEN_RATE_LIMIT: float = 10  # requests per second
+    KLEINANZEIGEN_RATE_LIMIT_MIN: float = 0.5  # requests per second
+    KLEINANZEIGEN_RATE_LIMIT_BURST: int = 10
+    KLEINANZEIGEN_MAX_RETRIES: int = 2
     
     @field_validator("ADMIN_USER_IDS", mode="before")
     def validate_admin_ids(cls, v):
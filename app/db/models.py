@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, BigInteger
+from sqlalchemy import Column, Computed, Integer, String, Boolean, DateTime, ForeignKey, Text, BigInteger, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import Enum
@@ -37,6 +37,7 @@ class Item(Base):
 
     id = Column(String, primary_key=True)  # ID от Kleinanzeigen
     raw_data = Column(JSONB, nullable=False)
+    content_hash = Column(String, Computed("md5(raw_data::text)", persisted=True))
     first_seen = Column(DateTime, default=datetime.utcnow)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -59,18 +60,39 @@ class SearchSettings(Base):
     ad_type: ItemAdType = Column(Enum(ItemAdType, name="item_ad_type", native_enum=False), nullable=True)
     poster_type: ItemPosterType = Column(Enum(ItemPosterType, name="item_poster_type", native_enum=False), nullable=True)
     is_picture_required = Column(Boolean, default=False)
+    # Filters applied locally to fetched ads, keywords are comma separated
+    required_keywords = Column(String, nullable=True)
+    excluded_keywords = Column(String, nullable=True)
+    title_pattern = Column(String, nullable=True)
+    max_ad_age_hours = Column(Integer, nullable=True)
     radius_km = Column(Integer, default=10)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     was_used = Column(Boolean, default=False)
+    last_seen_ad_id = Column(String, nullable=True)
+    last_seen_ad_at = Column(DateTime, nullable=True)
+    # Scanner replica currently scanning the search
+    leased_by = Column(String, nullable=True, index=True)
+    lease_expires_at = Column(DateTime, nullable=True)
 
     def mark_as_used(self):
         self.was_used = True
         self.updated_at = datetime.utcnow()
 
+class ScannerReplica(Base):
+    __tablename__ = "scanner_replicas"
+
+    id = Column(String, primary_key=True)  # SCANNER_ID of the replica
+    started_at = Column(DateTime, default=datetime.utcnow)
+    # Renewed with the leases, the replica counts towards the lease shares until then
+    heartbeat_expires_at = Column(DateTime, nullable=False, index=True)
+
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        UniqueConstraint("item_id", "user_id", "search_id", name="uq_notifications_item_id_user_id_search_id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     item_id = Column(String, ForeignKey('items.id'))
@@ -1,10 +1,67 @@
-from sqlalchemy import select
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import String, Text, case, cast, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
 from app.db.models import Item
 from app.db.repository import AsyncRepository
-from datetime import datetime
+from app.kleinanzeigen.projections import PROJECTION_KEY
+
+# Rows per INSERT, keeps the bind parameters well below the Postgres limit of 32767
+UPSERT_BATCH_SIZE = 1000
+
+
+class UpsertResult(NamedTuple):
+    inserted_ids: List[str]
+    # Ids of stored items whose content changed, e.g. after a price edit
+    changed_ids: List[str]
 
 
 class ItemRepository(AsyncRepository[Item]):
     def __init__(self, session):
         super().__init__(session, Item)
 
+    async def upsert_many(self, raw_data_by_id: Dict[str, dict]) -> UpsertResult:
+        """Insert or update items with one statement per batch.
+
+        A stored full payload is only refreshed with the fields of a reduced
+        projection instead of replaced. Stored items are only rewritten when the
+        hash of their content changes, so unchanged ads cost no JSONB writes;
+        they are not part of the result.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {"id": item_id, "raw_data": raw_data, "first_seen": now, "last_updated": now}
+            for item_id, raw_data in raw_data_by_id.items()
+        ]
+
+        inserted_ids = []
+        changed_ids = []
+        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = insert(self.model).values(rows[i:i + UPSERT_BATCH_SIZE])
+            is_partial_update = (
+                stmt.excluded.raw_data[PROJECTION_KEY].astext.isnot(None)
+                & self.model.raw_data[PROJECTION_KEY].astext.is_(None)
+            )
+            merged_raw_data = self.model.raw_data.op("||", return_type=JSONB)(
+                stmt.excluded.raw_data.op("-", return_type=JSONB)(literal(PROJECTION_KEY, String))
+            )
+            new_content_hash = case(
+                (is_partial_update, func.md5(cast(merged_raw_data, Text))),
+                else_=func.md5(cast(stmt.excluded.raw_data, Text)),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[self.model.id],
+                set_={
+                    "raw_data": case((is_partial_update, merged_raw_data), else_=stmt.excluded.raw_data),
+                    "last_updated": stmt.excluded.last_updated,
+                },
+                where=self.model.content_hash.is_distinct_from(new_content_hash),
+            ).returning(self.model.id, literal_column("xmax = 0").label("inserted"))
+            result = await self.session.execute(stmt)
+            for item_id, inserted in result.tuples():
+                (inserted_ids if inserted else changed_ids).append(item_id)
+
+        await self.session.commit()
+        return UpsertResult(inserted_ids, changed_ids)
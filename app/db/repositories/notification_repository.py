@@ -1,4 +1,7 @@
-from sqlalchemy import select, and_
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, and_, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from app.db.models import Notification
 from app.db.repository import AsyncRepository
 
@@ -36,6 +39,52 @@ class NotificationRepository(AsyncRepository[Notification]):
         )
         return result.scalar_one_or_none() is not None
     
+    async def get_unseen_item_ids(self, item_ids: List[str], user_id: int, search_id: str) -> List[str]:
+        """Return the ids in `item_ids` the search has no notification for yet, in one query."""
+        unseen_item_ids = await self.get_unseen_item_ids_for_searches({(user_id, search_id): item_ids})
+        return unseen_item_ids[(user_id, search_id)]
+
+    async def get_unseen_item_ids_for_searches(
+        self, item_ids_by_search: Dict[Tuple[int, str], List[str]]
+    ) -> Dict[Tuple[int, str], List[str]]:
+        """Like `get_unseen_item_ids` for many (user_id, search_id) pairs at once, in one query."""
+        all_item_ids = {item_id for item_ids in item_ids_by_search.values() for item_id in item_ids}
+        seen = set()
+        if all_item_ids:
+            result = await self.session.execute(
+                select(self.model.user_id, self.model.search_id, self.model.item_id).where(
+                    tuple_(self.model.user_id, self.model.search_id).in_(list(item_ids_by_search)),
+                    self.model.item_id.in_(all_item_ids),
+                )
+            )
+            seen = set(result.tuples().all())
+
+        return {
+            (user_id, search_id): [item_id for item_id in item_ids if (user_id, search_id, item_id) not in seen]
+            for (user_id, search_id), item_ids in item_ids_by_search.items()
+        }
+
+    async def get_recent_item_ids(self, search_ids: List[str], limit_per_search: int) -> List[Tuple[str, str]]:
+        """Return (search_id, item_id) of the newest notifications of every search, oldest first."""
+        if not search_ids:
+            return []
+
+        position = func.row_number().over(
+            partition_by=self.model.search_id,
+            order_by=self.model.created_at.desc(),
+        ).label("position")
+        recent = (
+            select(self.model.search_id, self.model.item_id, self.model.created_at, position)
+            .where(self.model.search_id.in_(search_ids))
+            .subquery()
+        )
+        result = await self.session.execute(
+            select(recent.c.search_id, recent.c.item_id)
+            .where(recent.c.position <= limit_per_search)
+            .order_by(recent.c.created_at)
+        )
+        return result.tuples().all()
+
     async def create_notification(self, item_id: str, user_id: int, search_id: str, is_sent: bool) -> Notification:
         new_notif = Notification(
             item_id=item_id,
@@ -44,3 +93,28 @@ class NotificationRepository(AsyncRepository[Notification]):
             is_sent=is_sent,
         )
         return await self.save(new_notif)
+
+    async def create_notifications(
+        self, item_ids: List[str], user_id: int, search_id: str, is_sent: bool
+    ) -> List[Notification]:
+        """Create notifications of many items for a search in one statement.
+
+        Items the search already has a notification for are skipped, so only
+        the notifications actually inserted are returned.
+        """
+        if not item_ids:
+            return []
+
+        stmt = (
+            insert(self.model)
+            .values([
+                {"item_id": item_id, "user_id": user_id, "search_id": search_id, "is_sent": is_sent}
+                for item_id in dict.fromkeys(item_ids)
+            ])
+            .on_conflict_do_nothing(index_elements=["item_id", "user_id", "search_id"])
+            .returning(self.model)
+        )
+        result = await self.session.execute(stmt)
+        notifications = result.scalars().all()
+        await self.session.commit()
+        return notifications
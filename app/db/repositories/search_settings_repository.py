@@ -1,7 +1,15 @@
-from sqlalchemy import select
-from app.db.models import SearchSettings
+import math
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from app.db.models import ScannerReplica, SearchSettings
 from app.db.repository import AsyncRepository
 
+# NOTIFY channel announcing ids of created, changed or deleted searches
+SEARCH_CHANGES_CHANNEL = "search_settings_changes"
+
 
 class SearchSettingsRepository(AsyncRepository[SearchSettings]):
     def __init__(self, session):
@@ -18,3 +26,132 @@ class SearchSettingsRepository(AsyncRepository[SearchSettings]):
             select(self.model).where(self.model.is_active == True)
         )
         return result.scalars().all()
+
+    async def get_active_by_ids(self, search_ids: List[str]):
+        result = await self.session.execute(
+            select(self.model).where(self.model.id.in_(search_ids), self.model.is_active == True)
+        )
+        return result.scalars().all()
+
+    async def get_saved_locations(self):
+        result = await self.session.execute(
+            select(self.model.location_id, self.model.location_name)
+            .where(self.model.location_id.is_not(None))
+            .distinct()
+        )
+        return result.all()
+
+    async def update_watermarks(self, search_ids: List[str], ad_id: Optional[str], ad_at: Optional[datetime]):
+        await self.session.execute(
+            update(self.model)
+            .where(self.model.id.in_(search_ids))
+            # Keep updated_at, the watermark is not a change of the search settings
+            .values(last_seen_ad_id=ad_id, last_seen_ad_at=ad_at, updated_at=self.model.updated_at)
+        )
+        await self.session.commit()
+
+    async def notify_changed(self, search_id: str):
+        """Announce a changed search to other processes, delivered on commit."""
+        await self.session.execute(
+            text("SELECT pg_notify(:channel, :search_id)"),
+            {"channel": SEARCH_CHANGES_CHANNEL, "search_id": search_id},
+        )
+        await self.session.commit()
+
+    async def lease_active_search_ids(self, owner: str, ttl: int) -> List[str]:
+        """Lease a fair share of the active searches to a scanner replica and return their ids.
+
+        Leases of `owner` are renewed for `ttl` seconds, and so is its heartbeat
+        in scanner_replicas. Replicas with a live heartbeat share the active
+        searches equally, even before they hold any lease: searches over the
+        share are released, and missing ones are taken from unleased or expired
+        rows with FOR UPDATE SKIP LOCKED, so concurrent replicas never lease the
+        same row.
+        Rows are taken in query order, which keeps searches sharing an upstream
+        query on the same replica.
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        order = (self.model.item_name, self.model.location_id, self.model.category_id, self.model.radius_km, self.model.id)
+        # Keep updated_at, a lease is not a change of the search settings
+        keep_updated_at = {"updated_at": self.model.updated_at}
+
+        # Register first, so other replicas shrink their shares before this one holds any lease
+        await self.session.execute(
+            insert(ScannerReplica)
+            .values(id=owner, heartbeat_expires_at=expires_at)
+            .on_conflict_do_update(index_elements=[ScannerReplica.id], set_={"heartbeat_expires_at": expires_at})
+        )
+        await self.session.execute(delete(ScannerReplica).where(ScannerReplica.heartbeat_expires_at < now))
+        await self.session.commit()
+
+        total = await self.session.scalar(
+            select(func.count()).select_from(self.model).where(self.model.is_active == True)
+        )
+        replicas = await self.session.scalar(
+            select(func.count()).select_from(ScannerReplica).where(ScannerReplica.heartbeat_expires_at > now)
+        )
+        held_ids = (await self.session.execute(
+            select(self.model.id)
+            .where(self.model.leased_by == owner, self.model.is_active == True)
+            .order_by(*order)
+        )).scalars().all()
+
+        released_ids, missing = get_lease_changes(held_ids, total, replicas)
+        if released_ids:
+            await self.session.execute(
+                update(self.model)
+                .where(self.model.id.in_(released_ids))
+                .values(leased_by=None, lease_expires_at=None, **keep_updated_at)
+            )
+
+        await self.session.execute(
+            update(self.model)
+            .where(self.model.leased_by == owner)
+            .values(lease_expires_at=expires_at, **keep_updated_at)
+        )
+
+        if missing > 0:
+            free_ids = (
+                select(self.model.id)
+                .where(
+                    self.model.is_active == True,
+                    or_(self.model.leased_by.is_(None), self.model.lease_expires_at < now),
+                )
+                .order_by(*order)
+                .limit(missing)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            await self.session.execute(
+                update(self.model)
+                .where(self.model.id.in_(free_ids))
+                .values(leased_by=owner, lease_expires_at=expires_at, **keep_updated_at)
+            )
+
+        await self.session.commit()
+
+        result = await self.session.execute(
+            select(self.model.id).where(self.model.leased_by == owner, self.model.is_active == True)
+        )
+        return result.scalars().all()
+
+    async def release_leases(self, owner: str):
+        await self.session.execute(
+            update(self.model)
+            .where(self.model.leased_by == owner)
+            .values(leased_by=None, lease_expires_at=None, updated_at=self.model.updated_at)
+        )
+        await self.session.execute(delete(ScannerReplica).where(ScannerReplica.id == owner))
+        await self.session.commit()
+
+
+def get_lease_changes(held_ids: Sequence[str], total: int, replicas: int) -> Tuple[Sequence[str], int]:
+    """Split `total` active searches equally between live replicas.
+
+    Returns the held ids over the share of a replica, to be released, and
+    how many searches it should take on top of the ones it keeps.
+    """
+    share = math.ceil(total / max(1, replicas))
+    released_ids = held_ids[share:]
+    return released_ids, share - (len(held_ids) - len(released_ids))
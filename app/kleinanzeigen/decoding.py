@@ -0,0 +1,48 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional dependency
+    ijson = None
+
+
+ADS_KEY = "{http://www.ebayclassifiedsgroup.com/schema/ad/v1}ads"
+
+# ijson prefix of every ad in a search response
+ADS_ITEM_PREFIX = f"{ADS_KEY}.value.ad.item"
+
+JSON_DECODERS: Dict[str, Optional[Callable[[bytes], Any]]] = {
+    "json": json.loads,
+    "orjson": orjson.loads if orjson is not None else None,
+}
+
+
+def get_json_decoder(name: str = "auto") -> Callable[[bytes], Any]:
+    """Return the JSON decoder with the given name, "auto" picks the fastest available one."""
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+
+    decoder = JSON_DECODERS.get(name)
+    if decoder is None:
+        logger.warning(f"JSON decoder {name} is not available, falling back to json")
+        return json.loads
+
+    return decoder
+
+
+def is_streaming_available() -> bool:
+    return ijson is not None
+
+
+async def iter_ads(stream) -> AsyncIterator[dict]:
+    """Yield ads of a search response one by one while it is being read from `stream`."""
+    async for ad in ijson.items_async(stream, ADS_ITEM_PREFIX, use_float=True):
+        yield ad
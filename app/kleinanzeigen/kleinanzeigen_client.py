@@ -8,7 +8,24 @@ from app.db.models import SearchSettings
 from app.config.settings import settings
 
 from .models import KleinanzeigenItem, KleinanzeigenItemLocation
-from typing import List, Optional
+from .rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from .decoding import ADS_KEY, get_json_decoder, is_streaming_available, iter_ads
+from .projections import get_projection_fields, mark_projection
+from .location_cache import LocationCache
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional
+
+# Returned instead of a response body when a conditional request was not modified
+NOT_MODIFIED = object()
+
+# Statuses that mean the upstream is throttling or overloaded
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Size of chunks used to drain the rest of a response body after stopping early
+DRAIN_CHUNK_SIZE = 64 * 1024
+
+# Maximum number of requests for which ETag/Last-Modified validators are remembered
+MAX_STORED_VALIDATORS = 10_000
 
 class KleinanzeigenClient:
     """Client for Kleinanzeigen.de API (singleton)."""
@@ -30,8 +47,87 @@ class KleinanzeigenClient:
         self.detail_url = self.base_url + "/ads/{ad_id}.json"
         self.location_url = self.base_url + "/locations.json"
 
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Set by close(), requests fail instead of reopening the session during shutdown
+        self._closed = False
+        self._validators: OrderedDict = OrderedDict()
+        self._payload_stats = {}
+        self.json_decoder = get_json_decoder(settings.KLEINANZEIGEN_JSON_DECODER)
+        self.stream_ads = settings.KLEINANZEIGEN_STREAM_ADS and is_streaming_available()
+        self.location_cache = LocationCache(
+            ttl=settings.KLEINANZEIGEN_LOCATION_CACHE_TTL,
+            max_entries=settings.KLEINANZEIGEN_LOCATION_CACHE_SIZE,
+        )
+        self.rate_limiter = AdaptiveRateLimiter(
+            max_rate=settings.KLEINANZEIGEN_RATE_LIMIT,
+            min_rate=settings.KLEINANZEIGEN_RATE_LIMIT_MIN,
+            burst=settings.KLEINANZEIGEN_RATE_LIMIT_BURST,
+        )
+        self._pool_stats = {
+            "created": 0,
+            "reused": 0,
+        }
+
+    async def start(self) -> None:
+        """Open the pooled HTTP session shared by all requests."""
+        self._closed = False
+        if self.session is not None and not self.session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=settings.KLEINANZEIGEN_CONNECTION_LIMIT,
+            limit_per_host=settings.KLEINANZEIGEN_CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=settings.KLEINANZEIGEN_DNS_CACHE_TTL,
+            keepalive_timeout=settings.KLEINANZEIGEN_KEEPALIVE_TIMEOUT,
+        )
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            trace_configs=[trace_config],
+        )
+        logger.info("Kleinanzeigen HTTP session opened")
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session and all its connections."""
+        self._closed = True
+        if self.session is None or self.session.closed:
+            return
+
+        await self.session.close()
+        self.session = None
+        logger.info("Kleinanzeigen HTTP session closed")
+
+    def get_pool_stats(self) -> dict:
+        """Return connection pool statistics: open, idle and reused connections."""
+        idle = 0
+        in_use = 0
+        if self.session is not None and not self.session.closed:
+            connector = self.session.connector
+            # aiohttp does not expose pool occupancy publicly
+            idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+            in_use = len(getattr(connector, "_acquired", ()))
+
+        return {
+            "open": idle + in_use,
+            "idle": idle,
+            "in_use": in_use,
+            "created": self._pool_stats["created"],
+            "reused": self._pool_stats["reused"],
+        }
+
+    async def _on_connection_create(self, session, trace_config_ctx, params) -> None:
+        self._pool_stats["created"] += 1
+
+    async def _on_connection_reuse(self, session, trace_config_ctx, params) -> None:
+        self._pool_stats["reused"] += 1
+
     async def fetch_one_item(self, ad_id: str) -> Optional[KleinanzeigenItem]:
-        response = await self._fetch(self.detail_url.format(ad_id=ad_id))
+        response = await self._fetch(self.detail_url.format(ad_id=ad_id), payload_label="detail")
 
         if response is None:
             return None
@@ -47,52 +143,196 @@ class KleinanzeigenClient:
             size=settings.KLEINANZEIGEN_MAX_ITEMS_PER_PAGE,
         )
 
-        response = await self._fetch(self.search_url, params)
+        return await self.fetch_items_by_params(params)
+
+    async def fetch_items_by_params(self, params: dict) -> Optional[List[KleinanzeigenItem]]:
+        response = await self.fetch_raw_ads(params)
 
-        if response is None:
-            return None
-        
-        response = response.get("{http://www.ebayclassifiedsgroup.com/schema/ad/v1}ads", {}).get("value", {}).get("ad", [])
         if not response:
             return None
         
         items = [KleinanzeigenItem(item) for item in response]
         return items
-    
-    async def fetch_locations(self, query: str) -> Optional[List[KleinanzeigenItemLocation]]:
+
+    async def fetch_raw_ads(
+        self,
+        params: dict,
+        conditional: bool = False,
+        stop_at: Optional[Callable[[dict], bool]] = None,
+        profile: str = "full",
+    ) -> Optional[List[dict]]:
+        """Fetch unparsed ads for the given params.
+
+        With `conditional` set, validators of the previous response are sent along
+        and `NOT_MODIFIED` is returned if the upstream reports no changes.
+        With `stop_at` set, only ads preceding the first ad it returns True for are returned.
+        `profile` selects the projection of the ad payload, see `PROJECTION_PROFILES`.
+        """
+        fields = get_projection_fields(profile)
+        if fields is not None:
+            params = {**params, "_in": fields}
+
+        if self.stream_ads:
+            ads = await self._fetch(
+                self.search_url,
+                params,
+                conditional=conditional,
+                reader=lambda response: self._read_ads(response, stop_at),
+                payload_label=profile,
+            )
+        else:
+            response = await self._fetch(self.search_url, params, conditional=conditional, payload_label=profile)
+
+            if response is None or response is NOT_MODIFIED:
+                return response
+
+            ads = response.get(ADS_KEY, {}).get("value", {}).get("ad", [])
+            for i, ad in enumerate(ads):
+                if stop_at is not None and stop_at(ad):
+                    ads = ads[:i]
+                    break
+
+        if ads and ads is not NOT_MODIFIED:
+            mark_projection(ads, profile)
+
+        return ads
+
+    async def fetch_locations(self, query: str, use_cache: bool = True) -> Optional[List[KleinanzeigenItemLocation]]:
+        """Look up locations by name or zip code, `use_cache=False` always asks upstream."""
+        cached_locations = self.location_cache.get(query) if use_cache else None
+        if cached_locations is not None:
+            return cached_locations
+
         params = {
             "depth": 1,
             "q": query
         }
 
-        response = await self._fetch(self.location_url, params)
+        response = await self._fetch(self.location_url, params, payload_label="locations")
 
         if response is None:
-            return None
+            # Locations resolved before are better than nothing while upstream fails
+            return self.location_cache.get_fallback(query)
         
         response = response.get("{http://www.ebayclassifiedsgroup.com/schema/location/v1}locations", {}).get("value", {}).get("location", [])
         if not response:
             return None
         
         locations = [KleinanzeigenItemLocation(location) for location in response][:10]
+        self.location_cache.put(query, locations)
         return locations
 
-    async def _fetch(self, url: str, params: dict = {}) -> dict:
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        return await response.json()
+    async def _fetch(
+        self,
+        url: str,
+        params: dict = {},
+        conditional: bool = False,
+        reader: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None,
+        payload_label: Optional[str] = None,
+    ) -> dict:
+        if self._closed:
+            logger.error(f"Not fetching {url}, the client is closed")
+            return None
+
+        if self.session is None or self.session.closed:
+            await self.start()
+
+        validators_key = (url, self.get_params_key(params))
+        headers = {}
+        if conditional:
+            validators = self._validators.get(validators_key, {})
+            if "etag" in validators:
+                headers["If-None-Match"] = validators["etag"]
+            if "last_modified" in validators:
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        for attempt in range(settings.KLEINANZEIGEN_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire()
+
+            try:
+                async with self.session.get(url, params=params, headers=headers) as response:
+                    if response.status == 304 and conditional:
+                        self.rate_limiter.on_success()
+                        return NOT_MODIFIED
+                    elif response.status == 200:
+                        self.rate_limiter.on_success()
+                        self._store_validators(validators_key, response)
+                        if reader is not None:
+                            result = await reader(response)
+                        else:
+                            result = self.json_decoder(await response.read())
+                        self._record_payload(payload_label, response.content.total_bytes)
+                        return result
+                    elif response.status in RETRYABLE_STATUSES:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        self.rate_limiter.on_throttle(retry_after)
+                        logger.warning(
+                            f"Throttled fetching {url}, status code: {response.status}, "
+                            f"retry after: {retry_after}, rate: {self.rate_limiter.rate:.2f} req/s "
+                            f"(attempt {attempt + 1}/{settings.KLEINANZEIGEN_MAX_RETRIES + 1})"
+                        )
                     else:
                         logger.error(f"Failed to fetch {url}, status code: {response.status}")
                         return None
-        except Exception as e:
-            logger.error(f"Error fetching {url}: {e}")
-            return None
-        
+            except Exception as e:
+                logger.error(f"Error fetching {url}: {e}")
+                return None
+
+        logger.error(f"Failed to fetch {url}, retries exhausted")
+        return None
+
+    def _record_payload(self, label: Optional[str], size: int) -> None:
+        stats = self._payload_stats.setdefault(label or "other", {"responses": 0, "bytes": 0})
+        stats["responses"] += 1
+        stats["bytes"] += size
+
+    def get_payload_stats(self) -> dict:
+        """Return the number and total size of decoded responses per projection profile."""
+        return {
+            label: {**stats, "avg_bytes": stats["bytes"] // stats["responses"]}
+            for label, stats in self._payload_stats.items()
+        }
+
+    async def _read_ads(
+        self,
+        response: aiohttp.ClientResponse,
+        stop_at: Optional[Callable[[dict], bool]],
+    ) -> List[dict]:
+        """Decode ads one by one from the response body, stopping at the first ad matching `stop_at`."""
+        ads = []
+        ads_iter = iter_ads(response.content)
+        try:
+            async for ad in ads_iter:
+                if stop_at is not None and stop_at(ad):
+                    break
+                ads.append(ad)
+        finally:
+            await ads_iter.aclose()
+
+        # Drain the undecoded rest of the body so the connection can be reused
+        async for _ in response.content.iter_chunked(DRAIN_CHUNK_SIZE):
+            pass
+
+        return ads
+
+    def _store_validators(self, key: tuple, response: aiohttp.ClientResponse) -> None:
+        validators = {}
+        if "ETag" in response.headers:
+            validators["etag"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            validators["last_modified"] = response.headers["Last-Modified"]
+
+        if not validators:
+            self._validators.pop(key, None)
+            return
+
+        self._validators[key] = validators
+        self._validators.move_to_end(key)
+        if len(self._validators) > MAX_STORED_VALIDATORS:
+            self._validators.popitem(last=False)
+
     def get_params(self, search_settings: SearchSettings, size: int = 5) -> dict:
         params = {
-            # "_in": "id,title,description,displayoptions,start-date-time,category.id,category.localized_name,ad-address.state,ad-address.zip-code,ad-address.availability-radius-in-km,price,pictures,link,features-active,search-distance,negotiation-enabled,attributes,medias,medias.media,medias.media.title,medias.media.media-link,buy-now,placeholder-image-present,labels,price-reduction,store-id,store-title,contact-name,contact-name-initials",
             "q": search_settings.item_name,
             "page": "0",
             "sortType": "DATE_DESCENDING",
@@ -123,6 +363,36 @@ class KleinanzeigenClient:
 
         return params
 
+    def get_feed_params(
+        self, category_id: Optional[str], location_id: Optional[str], distance: Optional[int], size: int = 100
+    ) -> dict:
+        """Params of the newest ads of a category and/or location, without a search query."""
+        params = {
+            "page": "0",
+            "sortType": "DATE_DESCENDING",
+            "size": str(size),
+            "includeTopAds": "false",
+            "buyNowOnly": "false",
+            "labelsGenerationEnabled": "true",
+            "limitTotalResultCount": "true"
+        }
+
+        if category_id is not None:
+            params["categoryId"] = category_id
+
+        if location_id is not None:
+            params["locationId"] = location_id
+
+            if distance is not None:
+                params["distance"] = distance
+
+        return params
+
+    @staticmethod
+    def get_params_key(params: dict) -> tuple:
+        """Normalize request params into a hashable key, identical for identical requests."""
+        return tuple(sorted((str(key), str(value)) for key, value in params.items()))
+
     @staticmethod
     def generate_custom_id(extra_digits: int = 13) -> str:
         base_uuid = str(uuid.uuid4())
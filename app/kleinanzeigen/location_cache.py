@@ -0,0 +1,137 @@
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from .models import KleinanzeigenItemLocation
+
+
+class LocationCache:
+    """TTL+LRU cache of location lookups with a prefix index over resolved locations.
+
+    Repeated queries are answered from the cache, partial ones ("Berl") from the
+    prefix index of the locations resolved or warmed within the TTL. The index
+    knows only locations seen before, so a partial query can miss others until
+    its hits expire. Expired index entries still answer while upstream fails.
+    """
+
+    def __init__(self, ttl: int, max_entries: int, max_results: int = 10, max_locations: Optional[int] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_results = max_results
+        self.max_locations = max_locations if max_locations is not None else max_entries * max_results
+        self._entries: "OrderedDict[str, Tuple[float, List[KleinanzeigenItemLocation]]]" = OrderedDict()
+        # Sorted "<normalized name>\0<location id>" keys, and per location (least recently
+        # resolved first) the location, its keys and when it expires from prefix answers
+        self._index_keys: List[str] = []
+        self._locations: "OrderedDict[str, Tuple[KleinanzeigenItemLocation, List[str], float]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "prefix_hits": 0,
+            "fallback_hits": 0,
+            "misses": 0,
+        }
+
+    def get(self, query: str) -> Optional[List[KleinanzeigenItemLocation]]:
+        key = normalize_location_query(query)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, locations = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return locations
+            del self._entries[key]
+
+        locations = self.search_prefix(key)
+        if locations:
+            self.stats["prefix_hits"] += 1
+            return locations
+
+        self.stats["misses"] += 1
+        return None
+
+    def get_fallback(self, query: str) -> Optional[List[KleinanzeigenItemLocation]]:
+        """Answer a query from the prefix index, for when upstream is unavailable."""
+        locations = self.search_prefix(normalize_location_query(query), include_expired=True)
+        if not locations:
+            return None
+
+        self.stats["fallback_hits"] += 1
+        return locations
+
+    def put(self, query: str, locations: List[KleinanzeigenItemLocation]) -> None:
+        key = normalize_location_query(query)
+        self._entries[key] = (time.monotonic() + self.ttl, locations)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        for location in locations:
+            self.add_location(location)
+
+    def add_location(self, location: KleinanzeigenItemLocation) -> None:
+        """Add a resolved location to the prefix index, or refresh it."""
+        if location.id is None:
+            return
+
+        location_id = str(location.id)
+        entry = self._locations.pop(location_id, None)
+        if entry is not None:
+            self._remove_keys(entry[1])
+
+        keys = [
+            f"{normalize_location_query(name)}\0{location_id}"
+            for name in (location.zip_code_localized, location.zip_code) if name
+        ]
+        for key in keys:
+            insort(self._index_keys, key)
+        self._locations[location_id] = (location, keys, time.monotonic() + self.ttl)
+
+        if len(self._locations) > self.max_locations:
+            _, (_, evicted_keys, _) = self._locations.popitem(last=False)
+            self._remove_keys(evicted_keys)
+
+    def warm(self, locations: Iterable[Tuple[str, str]]) -> int:
+        """Index previously saved (location id, location name) pairs, returns how many were added."""
+        count = len(self._locations)
+        for location_id, location_name in locations:
+            if location_id and location_name and str(location_id) not in self._locations:
+                self.add_location(KleinanzeigenItemLocation({
+                    "id": location_id,
+                    "localized-name": {"value": location_name},
+                }))
+        return len(self._locations) - count
+
+    def search_prefix(self, prefix: str, include_expired: bool = False) -> List[KleinanzeigenItemLocation]:
+        if not prefix:
+            return []
+
+        now = time.monotonic()
+        locations = []
+        seen_ids = set()
+        i = bisect_left(self._index_keys, prefix)
+        while i < len(self._index_keys) and len(locations) < self.max_results:
+            name, location_id = self._index_keys[i].split("\0", 1)
+            if not name.startswith(prefix):
+                break
+            location, _, expires_at = self._locations[location_id]
+            if location_id not in seen_ids and (include_expired or expires_at > now):
+                seen_ids.add(location_id)
+                locations.append(location)
+            i += 1
+
+        return locations
+
+    def _remove_keys(self, keys: List[str]) -> None:
+        for key in keys:
+            i = bisect_left(self._index_keys, key)
+            if i < len(self._index_keys) and self._index_keys[i] == key:
+                del self._index_keys[i]
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "entries": len(self._entries), "indexed_locations": len(self._locations)}
+
+
+def normalize_location_query(query: str) -> str:
+    return " ".join(query.casefold().split())
@@ -59,19 +59,19 @@ class KleinanzeigenItemPrice(KleinanzeigenItemPriceType):
 
 class KleinanzeigenSeller(KleinanzeigenSellerType):
     def __init__(self, item_data: dict):
-        self.__item_data = item_data
-        self.__parse_seller_data()
-
-    def __parse_seller_data(self) -> None:
-        self.name = self.__item_data.get("contact-name", {}).get("value", None)
-        self.initials = self.__item_data.get("contact-name-initials", {}).get("value", None)
-        self.user_id = self.__item_data.get("user-id", {}).get("value", None)
-        self.store_id = self.__item_data.get("store-id", {}).get("value", None)
-        self.seller_account_type = SellerAccountType.from_str(self.__item_data.get("seller-account-type", {}).get("value", ""))
-        self.user_rating = self.__item_data.get("user-rating", {}).get("averageRating", {}).get("value", None)
-        self.user_badges = [KleinanzeigenUserBadge(badge) for badge in self.__item_data.get("user-badges", {}).get("badges", [])]
-        self.phone = self.__item_data.get("phone", {}).get("value", {})
-        self.registration_date_str = self.__item_data.get("user-since-date-time", {}).get("value", None)
+        # The whole ad is not kept, parsed items are sent between processes
+        self.__parse_seller_data(item_data)
+
+    def __parse_seller_data(self, item_data: dict) -> None:
+        self.name = item_data.get("contact-name", {}).get("value", None)
+        self.initials = item_data.get("contact-name-initials", {}).get("value", None)
+        self.user_id = item_data.get("user-id", {}).get("value", None)
+        self.store_id = item_data.get("store-id", {}).get("value", None)
+        self.seller_account_type = SellerAccountType.from_str(item_data.get("seller-account-type", {}).get("value", ""))
+        self.user_rating = item_data.get("user-rating", {}).get("averageRating", {}).get("value", None)
+        self.user_badges = [KleinanzeigenUserBadge(badge) for badge in item_data.get("user-badges", {}).get("badges", [])]
+        self.phone = item_data.get("phone", {}).get("value", {})
+        self.registration_date_str = item_data.get("user-since-date-time", {}).get("value", None)
         self.registration_date = parse_date_str(self.registration_date_str) if self.registration_date_str else None
 
 class KleinanzeigenItemCategory(KleinanzeigenItemCategoryType):
@@ -122,10 +122,12 @@ class KleinanzeigenItemLocation(KleinanzeigenItemLocationType):
             self.region = self.zip_code_localized
 
     def __str__(self) -> str:
+        # Locations warmed from saved searches only have their name
         if self.__ad_dict_raw is None:
-            return f"{self.region} - {self.zip_code_localized}"
+            parts = (self.region, self.zip_code_localized)
         else:
-            return f"{self.zip_code_localized} - {self.zip_code}"
+            parts = (self.zip_code_localized, self.zip_code)
+        return " - ".join(part for part in parts if part)
 
 class KleinanzeigenPicture(KleinanzeigenPictureType):
     def __init__(self, picture_data: dict):
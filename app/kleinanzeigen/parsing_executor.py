@@ -0,0 +1,130 @@
+import asyncio
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from app.config.settings import settings
+
+from .models import KleinanzeigenItem
+
+PARSING_EXECUTOR_MODES = ("inline", "process")
+
+
+class ParsingExecutor:
+    """Parses ads inline or in a process pool, and renders item messages.
+
+    In process mode batches of raw ads are parsed in worker processes, which
+    send back parsed items without their raw data, so the event loop only pays
+    for unpickling. Batches smaller than `min_batch_size` are parsed inline,
+    where the round trip costs more than it saves, and so is everything after
+    the pool broke. Messages are sent one at a time, so each would be a batch
+    of one and is always rendered inline.
+    """
+
+    def __init__(self, mode: str = "inline", max_workers: int = 0, min_batch_size: int = 1):
+        if mode not in PARSING_EXECUTOR_MODES:
+            logger.warning(f"Unknown parsing executor mode {mode}, parsing inline")
+            mode = "inline"
+
+        self.mode = mode
+        self.max_workers = max_workers or get_available_cores()
+        self.min_batch_size = min_batch_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {
+            "inline_batches": 0,
+            "process_batches": 0,
+            "parsed_ads": 0,
+            "rendered_messages": 0,
+            "fallbacks": 0,
+        }
+
+    async def parse_items(self, raw_ads: List[dict]) -> List[KleinanzeigenItem]:
+        """Parse raw ads into items."""
+        self.stats["parsed_ads"] += len(raw_ads)
+        if self.mode != "process" or len(raw_ads) < self.min_batch_size:
+            self.stats["inline_batches"] += 1
+            return parse_items(raw_ads)
+
+        items = await self._run(parse_items_compact, raw_ads)
+        if items is None:
+            self.stats["inline_batches"] += 1
+            return parse_items(raw_ads)
+
+        self.stats["process_batches"] += 1
+        for item, raw_ad in zip(items, raw_ads):
+            item.raw_data = raw_ad
+        return items
+
+    def render_item_message(self, raw_data: dict, alias: Optional[str] = None) -> Tuple[str, Optional[list]]:
+        """Render the notification text and media group of an ad."""
+        self.stats["rendered_messages"] += 1
+        return render_item_message(raw_data, alias)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "mode": self.mode, "workers": self.max_workers if self.mode == "process" else 0}
+
+    async def _run(self, func, *args):
+        """Run `func` in the pool, returns None and falls back to inline mode if the pool is broken."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            logger.info(f"Started parsing process pool with {self.max_workers} workers")
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+        except BrokenProcessPool as e:
+            logger.error(f"Parsing process pool is broken, parsing inline from now on: {e}")
+            self.stats["fallbacks"] += 1
+            self.mode = "inline"
+            self.shutdown()
+            return None
+
+
+def get_available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def parse_items(raw_ads: List[dict]) -> List[KleinanzeigenItem]:
+    return [KleinanzeigenItem(raw_ad) for raw_ad in raw_ads]
+
+
+def parse_items_compact(raw_ads: List[dict]) -> List[KleinanzeigenItem]:
+    """Parse raw ads in a worker process, the caller already has the raw data."""
+    items = parse_items(raw_ads)
+    for item in items:
+        item.raw_data = None
+    return items
+
+
+def render_item_message(raw_data: dict, alias: Optional[str] = None) -> Tuple[str, Optional[list]]:
+    # Imported here, message builders depend on the bot and database packages
+    from app.builders.message_builder import SingleKleinanzeigenItemMessageBuilder
+
+    search_settings = SimpleNamespace(alias=alias) if alias is not None else None
+    message_builder = SingleKleinanzeigenItemMessageBuilder(KleinanzeigenItem(raw_data), search_settings)
+    return message_builder.message_text, message_builder.message_media
+
+
+def _init_worker():
+    # Shutdown is handled by the parent process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+# Create singleton instance
+parsing_executor = ParsingExecutor(
+    mode=settings.PARSING_EXECUTOR,
+    max_workers=settings.PARSING_WORKERS,
+    min_batch_size=settings.PARSING_MIN_BATCH_SIZE,
+)
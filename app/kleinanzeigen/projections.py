@@ -0,0 +1,46 @@
+from typing import Dict, List, Optional
+
+# Key added to raw ads fetched with a reduced projection
+PROJECTION_KEY = "_projection"
+
+# Profile name -> value of the `_in` request param (None requests the full payload)
+PROJECTION_PROFILES: Dict[str, Optional[str]] = {
+    # Enough to deduplicate ads and filter them locally, keyword filters and
+    # routing need the description like the upstream full-text search
+    "scan": ",".join([
+        "id",
+        "title",
+        "description",
+        "price",
+        "start-date-time",
+        "ad-type",
+        "poster-type",
+        "ad-address.state",
+        "ad-address.zip-code",
+        "ad-address.latitude",
+        "ad-address.longitude",
+        "pictures",
+    ]),
+    # Everything needed to render notifications
+    "full": None,
+}
+
+
+def get_projection_fields(profile: str) -> Optional[str]:
+    if profile not in PROJECTION_PROFILES:
+        raise ValueError(f"Unknown projection profile: {profile}")
+    return PROJECTION_PROFILES[profile]
+
+
+def mark_projection(raw_ads: List[dict], profile: str) -> None:
+    """Mark ads fetched with a reduced projection, so they can be enriched later."""
+    if PROJECTION_PROFILES.get(profile) is None:
+        return
+
+    for raw_ad in raw_ads:
+        raw_ad[PROJECTION_KEY] = profile
+
+
+def is_partial(raw_data: dict) -> bool:
+    """Check whether the ad payload lacks fields of the full projection."""
+    return raw_data.get(PROJECTION_KEY) is not None
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by all requests to the Kleinanzeigen API.
+
+    The rate is cut multiplicatively whenever the upstream throttles us and grows
+    back additively with every successful request, up to `max_rate`.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: float,
+        burst: int,
+        decrease_factor: float = 0.5,
+        recovery_requests: int = 50,
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.burst = max(1, burst)
+        self.decrease_factor = decrease_factor
+        # Rate added per successful request, so a full recovery takes `recovery_requests` requests
+        self.increase_step = max_rate / max(1, recovery_requests)
+
+        self.rate = max_rate
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "acquired": 0,
+            "throttled": 0,
+            "waited_seconds": 0.0,
+        }
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.stats["acquired"] += 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+
+                self.stats["waited_seconds"] += delay
+                await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Slow down after a 429/5xx, pausing all requests for `retry_after` seconds if given."""
+        now = time.monotonic()
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = 0.0
+        self._updated_at = now
+        self.stats["throttled"] += 1
+
+        if retry_after is None:
+            retry_after = 1 / self.rate
+        self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "rate": round(self.rate, 3),
+            "blocked_for": round(max(0.0, self._blocked_until - time.monotonic()), 3),
+        }
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -3,6 +3,8 @@ import sys
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
@@ -17,13 +19,17 @@ from app.bot.routers import (
     search_create_router,
     settings_router
 )
-from app.db.database import engine
+from app.db.database import async_session, engine
+from app.db.repositories import SearchSettingsRepository
 from app.bot.middlewares import UserAccessMiddleware
 from app.bot.notifications import send_item_notifications
 from app.config.settings import settings
 from app.utils.logging import setup_logging
 from app.workers.parsing_worker import parsing_worker
+from app.services.scan_service import scan_service
+from app.services.search_registry import search_registry
 from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient
+from app.kleinanzeigen.parsing_executor import parsing_executor
 
 # Set up logging
 logger = setup_logging()
@@ -32,10 +38,23 @@ logger = setup_logging()
 async def on_startup(bot: Bot):
     """Execute actions on bot startup."""   
     logger.info("Bot is starting up...")
+
+    # Open pooled HTTP session for Kleinanzeigen API
+    kleinanzeigen_client = KleinanzeigenClient.get_instance()
+    await kleinanzeigen_client.start()
+
+    # Warm location cache with locations of saved searches
+    async with async_session() as session:
+        saved_locations = await SearchSettingsRepository(session).get_saved_locations()
+    warmed = kleinanzeigen_client.location_cache.warm(saved_locations)
+    logger.info(f"Location cache warmed with {warmed} saved locations")
     
-    # Start parsing worker
-    logger.info("Starting parsing worker...")
-    parsing_worker.start()
+    # Start parsing worker, unless searches are scanned by standalone scanners
+    if settings.EMBEDDED_SCANNER:
+        await search_registry.start()
+        await scan_service.warm_seen_ads()
+        logger.info("Starting parsing worker...")
+        parsing_worker.start()
     
     # Set up commands
     await bot.set_my_commands([
@@ -54,8 +73,20 @@ async def on_shutdown(bot: Bot):
     logger.info("Bot is shutting down...")
     
     # Stop parsing worker
-    logger.info("Stopping parsing worker...")
-    parsing_worker.stop()
+    if settings.EMBEDDED_SCANNER:
+        logger.info("Stopping parsing worker...")
+        parsing_worker.stop()
+        # Let in-flight scans finish cancelling before their leases, sessions and pools go away
+        await parsing_worker.wait_stopped()
+        await scan_service.release_leases()
+        await search_registry.stop()
+
+    # Close Kleinanzeigen HTTP session
+    logger.info("Closing Kleinanzeigen HTTP session...")
+    kleinanzeigen_client = KleinanzeigenClient.get_instance()
+    logger.info(f"Kleinanzeigen connection pool stats: {kleinanzeigen_client.get_pool_stats()}")
+    await kleinanzeigen_client.close()
+    parsing_executor.shutdown()
 
     # Close database connections
     logger.info("Closing database connections...")
@@ -90,7 +121,11 @@ async def main():
     KleinanzeigenClient.get_instance()
 
     # Initialize bot and dispatcher
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(
+    session = None
+    if settings.TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL))
+
+    bot = Bot(token=settings.BOT_TOKEN, session=session, default=DefaultBotProperties(
         parse_mode=ParseMode.HTML
     ))
     dp = Dispatcher(storage=MemoryStorage())
@@ -0,0 +1,63 @@
+import asyncio
+import signal
+import sys
+
+from app.config.settings import settings
+from app.db.database import engine
+from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient
+from app.kleinanzeigen.parsing_executor import parsing_executor
+from app.services.scan_service import scan_service
+from app.services.search_registry import search_registry
+from app.utils.logging import setup_logging
+from app.workers.parsing_worker import parsing_worker
+
+# Set up logging
+logger = setup_logging()
+
+
+async def main():
+    """Run a standalone scanner replica.
+
+    Any number of replicas can run next to the bot (with EMBEDDED_SCANNER=False)
+    on one or more hosts. They split the active searches between them with
+    leases on the search_settings rows.
+    """
+    # Import locally to avoid circular imports
+    import app
+
+    scan_service.enable_leasing()
+    logger.info(f"Starting Kleinanzeigen Sniper scanner {scan_service.lease_owner} v{app.__version__}")
+
+    if settings.SCANNER_LEASE_TTL < 2 * settings.REQUEST_INTERVAL:
+        logger.warning("SCANNER_LEASE_TTL should be at least twice REQUEST_INTERVAL, leases may expire between renewals")
+
+    kleinanzeigen_client = KleinanzeigenClient.get_instance()
+    await kleinanzeigen_client.start()
+    await search_registry.start()
+    await scan_service.warm_seen_ads()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, parsing_worker.stop)
+
+    try:
+        await parsing_worker.run_forever()
+    finally:
+        logger.info("Scanner is shutting down...")
+        await scan_service.release_leases()
+        await search_registry.stop()
+        logger.info(f"Kleinanzeigen connection pool stats: {kleinanzeigen_client.get_pool_stats()}")
+        await kleinanzeigen_client.close()
+        parsing_executor.shutdown()
+        await engine.dispose()
+        logger.info("Scanner stopped!")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Scanner stopped!")
+    except Exception as e:
+        logger.exception(f"Fatal error: {e}")
+        sys.exit(1)
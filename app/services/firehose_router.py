@@ -0,0 +1,132 @@
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.db.models import SearchSettings
+from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient
+from app.kleinanzeigen.models import KleinanzeigenItem
+from app.services.keyword_matcher import KeywordMatcher, tokenize
+from app.services.search_filter import ItemFeatures, SearchFilterEngine
+
+EARTH_RADIUS_KM = 6371.0
+# Seconds until the coordinates of a location are looked up again after a failed lookup
+CENTER_RETRY_INTERVAL = 600
+
+Coordinates = Tuple[float, float]
+
+
+class FirehoseRouter:
+    """Routes the ads of a category/location feed to the searches they match.
+
+    Candidate searches come from the keyword matcher over item names, then the
+    compiled filters of every candidate and its radius around the search
+    location are checked. Search locations are resolved to coordinates once,
+    upstream and not from the location cache (cached entries may lack them);
+    while a location has none, its searches get every ad of their feed and the
+    lookup is retried every `CENTER_RETRY_INTERVAL` seconds.
+    """
+
+    def __init__(self, kleinanzeigen_client: KleinanzeigenClient, filters: SearchFilterEngine):
+        self.kleinanzeigen_client = kleinanzeigen_client
+        self.filters = filters
+        # Location id -> coordinates, and when to retry locations which could not be resolved
+        self._centers: Dict[str, Coordinates] = {}
+        self._retry_at: Dict[str, float] = {}
+        self.stats = {
+            "routed_ads": 0,
+            "keyword_matches": 0,
+            "filtered": 0,
+            "out_of_radius": 0,
+            "deliveries": 0,
+        }
+
+    async def resolve_centers(self, searches: List[SearchSettings]) -> None:
+        """Look up the coordinates of search locations not resolved yet."""
+        now = time.monotonic()
+        for search in searches:
+            location_id = search.location_id
+            if location_id is None or location_id in self._centers or self._retry_at.get(location_id, 0) > now:
+                continue
+
+            # Mark before awaiting, so concurrent feeds of the location do not look it up too
+            self._retry_at[location_id] = now + CENTER_RETRY_INTERVAL
+            locations = await self.kleinanzeigen_client.fetch_locations(
+                search.location_name or location_id, use_cache=False
+            ) or []
+            for location in locations:
+                center = _get_coordinates(location)
+                if str(location.id) == str(location_id) and center is not None:
+                    self._centers[location_id] = center
+                    del self._retry_at[location_id]
+                    break
+            else:
+                logger.warning(
+                    f"Could not resolve coordinates of location {search.location_name} ({location_id}), "
+                    f"not checking radius, retrying in {CENTER_RETRY_INTERVAL}s"
+                )
+
+    def route(
+        self,
+        searches: List[SearchSettings],
+        items: List[KleinanzeigenItem],
+        matcher: KeywordMatcher,
+        now: Optional[float] = None,
+    ) -> Dict[str, List[KleinanzeigenItem]]:
+        """Return the items matching every search, in feed order."""
+        now = time.time() if now is None else now
+        searches_by_id = {search.id: search for search in searches}
+        items_by_search = {search.id: [] for search in searches}
+        # Searches without item name terms are not in the matcher and get every ad of their feed
+        browsing_ids = {search.id for search in searches if not tokenize(search.item_name or "")}
+
+        for item in items:
+            features = ItemFeatures.from_item(item, now)
+            position = _get_coordinates(item.location) if item.location is not None else None
+            for search_id in matcher.match_tokens(features.words) | browsing_ids:
+                search = searches_by_id.get(search_id)
+                if search is None:
+                    continue
+
+                self.stats["keyword_matches"] += 1
+                if not self.filters.get_filter(search)(features):
+                    self.stats["filtered"] += 1
+                    continue
+
+                if not self._is_within_radius(search, position):
+                    self.stats["out_of_radius"] += 1
+                    continue
+
+                items_by_search[search_id].append(item)
+                self.stats["deliveries"] += 1
+
+        self.stats["routed_ads"] += len(items)
+        return items_by_search
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "locations": len(self._centers), "unresolved_locations": len(self._retry_at)}
+
+    def _is_within_radius(self, search: SearchSettings, position: Optional[Coordinates]) -> bool:
+        if search.location_id is None or search.radius_km is None or position is None:
+            return True
+
+        center = self._centers.get(search.location_id)
+        if center is None:
+            return True
+
+        return get_distance_km(center, position) <= search.radius_km
+
+
+def get_distance_km(a: Coordinates, b: Coordinates) -> float:
+    """Great-circle distance with the haversine formula."""
+    lat_a, lon_a, lat_b, lon_b = map(math.radians, (*a, *b))
+    h = math.sin((lat_b - lat_a) / 2) ** 2 + math.cos(lat_a) * math.cos(lat_b) * math.sin((lon_b - lon_a) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def _get_coordinates(location) -> Optional[Coordinates]:
+    try:
+        return float(location.latitude), float(location.longitude)
+    except (TypeError, ValueError):
+        return None
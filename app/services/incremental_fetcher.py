@@ -0,0 +1,150 @@
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from app.db.models import SearchSettings
+from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient, NOT_MODIFIED
+from app.kleinanzeigen.utils import parse_date_str
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """Newest ad a search has already seen."""
+    ad_id: Optional[str]
+    ad_at: Optional[datetime]  # naive UTC, like other DateTime columns
+
+    @classmethod
+    def from_search(cls, search: SearchSettings) -> Optional["Watermark"]:
+        if search.last_seen_ad_id is None and search.last_seen_ad_at is None:
+            return None
+        return cls(search.last_seen_ad_id, search.last_seen_ad_at)
+
+    @classmethod
+    def from_raw_ad(cls, raw_ad: dict) -> "Watermark":
+        return cls(raw_ad.get("id"), get_ad_date(raw_ad))
+
+    @staticmethod
+    def oldest(watermarks: Iterable[Optional["Watermark"]]) -> Optional["Watermark"]:
+        """Return the watermark covering all given ones, None if no search has one yet.
+
+        Searches without a watermark are ignored: their first scan only records
+        a baseline, so it needs no catch-up, while the others of a shared query
+        still do.
+        """
+        oldest = None
+        for watermark in watermarks:
+            if watermark is None:
+                continue
+            if oldest is None or (watermark.ad_at or datetime.min) < (oldest.ad_at or datetime.min):
+                oldest = watermark
+        return oldest
+
+    def is_reached_by(self, raw_ad: dict) -> bool:
+        """Check whether an ad is not newer than the watermark (ads come sorted by date descending)."""
+        if self.ad_id is not None and raw_ad.get("id") == self.ad_id:
+            return True
+
+        ad_at = get_ad_date(raw_ad)
+        return self.ad_at is not None and ad_at is not None and ad_at < self.ad_at
+
+
+def get_ad_date(raw_ad: dict) -> Optional[datetime]:
+    date_str = raw_ad.get("start-date-time", {}).get("value")
+    if not date_str:
+        return None
+
+    try:
+        return parse_date_str(date_str).astimezone(timezone.utc).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class IncrementalFetcher:
+    """Fetches the ads of a query which are newer than a watermark.
+
+    Pages are requested until the watermark is crossed, so busy queries are caught
+    up completely. The page size of every query adapts to how many new ads it got
+    last time, so quiet queries download small pages.
+    """
+
+    def __init__(
+        self,
+        kleinanzeigen_client: KleinanzeigenClient,
+        min_page_size: int,
+        max_page_size: int,
+        max_pages: int,
+    ):
+        self.kleinanzeigen_client = kleinanzeigen_client
+        self.min_page_size = min(min_page_size, max_page_size)
+        self.max_page_size = max_page_size
+        self.max_pages = max(1, max_pages)
+        self.page_sizes: Dict[tuple, int] = {}
+        self.stats = {
+            "requests": 0,
+            "catch_up_requests": 0,
+            "truncated": 0,
+        }
+
+    async def fetch(
+        self,
+        key: tuple,
+        params: dict,
+        watermark: Optional[Watermark],
+        conditional: bool = False,
+        profile: str = "full",
+    ):
+        """Fetch ads newer than `watermark`, newest first.
+
+        Returns None if the first page failed and `NOT_MODIFIED` if the upstream
+        reported no changes. Without a watermark only one full page is fetched.
+        """
+        page_size = self.page_sizes.get(key, self.max_page_size) if watermark is not None else self.max_page_size
+        stop_at = watermark.is_reached_by if watermark is not None else None
+
+        ads: List[dict] = []
+        seen_ids = set()
+        for page in range(self.max_pages):
+            page_ads = await self.kleinanzeigen_client.fetch_raw_ads(
+                {**params, "page": str(page), "size": str(page_size)},
+                conditional=conditional and page == 0,
+                stop_at=stop_at,
+                profile=profile,
+            )
+            self.stats["requests"] += 1
+            if page > 0:
+                self.stats["catch_up_requests"] += 1
+
+            if page_ads is NOT_MODIFIED:
+                return NOT_MODIFIED
+
+            if page_ads is None:
+                if page == 0:
+                    return None
+                break
+
+            # Pages shift while new ads are posted, so the same ad can show up twice
+            for ad in page_ads:
+                if ad.get("id") not in seen_ids:
+                    seen_ids.add(ad.get("id"))
+                    ads.append(ad)
+
+            if watermark is None or len(page_ads) < page_size:
+                break
+        else:
+            if watermark is not None:
+                self.stats["truncated"] += 1
+                logger.warning(f"⚠️ Watermark not reached after {self.max_pages} pages for search: {params.get('q')}")
+
+        self.page_sizes[key] = self._get_next_page_size(len(ads))
+        return ads
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+    def _get_next_page_size(self, new_ads_count: int) -> int:
+        # Leave headroom for a busier cycle than the last one
+        page_size = math.ceil(new_ads_count * 1.5) + 1
+        return max(self.min_page_size, min(self.max_page_size, page_size))
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config.settings import settings
+from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient
+from app.kleinanzeigen.models import KleinanzeigenItem
+
+
+class ItemDetailService:
+    """Service for fetching ad details.
+
+    Details are cached for `ttl` seconds and concurrent requests for the same ad
+    share one upstream request.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, KleinanzeigenItem]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            "cache_hits": 0,
+            "coalesced": 0,
+            "upstream_requests": 0,
+        }
+
+    async def get_item(self, ad_id: str) -> Optional[KleinanzeigenItem]:
+        """Get full details of an ad."""
+        entry = self._cache.get(ad_id)
+        if entry is not None:
+            expires_at, item = entry
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(ad_id)
+                self.stats["cache_hits"] += 1
+                return item
+            del self._cache[ad_id]
+
+        future = self._in_flight.get(ad_id)
+        if future is None:
+            future = asyncio.ensure_future(self._load(ad_id))
+            self._in_flight[ad_id] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(ad_id, None))
+        else:
+            self.stats["coalesced"] += 1
+
+        # A cancelled caller must not cancel the request other callers are waiting for
+        return await asyncio.shield(future)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "entries": len(self._cache), "in_flight": len(self._in_flight)}
+
+    async def _load(self, ad_id: str) -> Optional[KleinanzeigenItem]:
+        self.stats["upstream_requests"] += 1
+        item = await KleinanzeigenClient.get_instance().fetch_one_item(ad_id)
+        if item is not None:
+            self._put(ad_id, item)
+
+        return item
+
+    def _put(self, ad_id: str, item: KleinanzeigenItem) -> None:
+        self._cache[ad_id] = (time.monotonic() + self.ttl, item)
+        self._cache.move_to_end(ad_id)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+
+# Create singleton instance
+item_detail_service = ItemDetailService(
+    ttl=settings.KLEINANZEIGEN_ITEM_DETAIL_CACHE_TTL,
+    max_entries=settings.KLEINANZEIGEN_ITEM_DETAIL_CACHE_SIZE,
+)
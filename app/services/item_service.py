@@ -1,8 +1,12 @@
-from datetime import datetime
+from typing import Optional
+
+from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import Item
 from app.db.repositories import ItemRepository
+from app.kleinanzeigen.projections import is_partial
+from app.services.item_detail_service import item_detail_service
 
 
 class ItemService:
@@ -17,13 +21,26 @@ class ItemService:
 
     async def get_or_create_by_id(self, item_id: str, data: dict) -> Item:
         repo = ItemRepository(self.session)
-        if await repo.exists(item_id):
-            existing = await repo.get_by_id(item_id)
-            existing.raw_data = data
-            existing.last_updated = datetime.utcnow()
-            return await repo.save(existing)
+        result = await repo.upsert_many({item_id: data})
+        if item_id in result.changed_ids:
+            logger.debug(f"Content of item {item_id} changed")
+        return await self._reload(item_id)
+
+    async def get_full_by_id(self, item_id: str) -> Optional[Item]:
+        """Get an item, fetching its full payload first if only a reduced projection is stored."""
+        repo = ItemRepository(self.session)
+        item = await repo.get_by_id(item_id)
+        if item is None or not is_partial(item.raw_data):
+            return item
 
-        new_item = Item(id=item_id, raw_data=data)
-        return await repo.save(new_item)
+        full_item = await item_detail_service.get_item(item_id)
+        if full_item is None:
+            logger.warning(f"Could not fetch full payload for item {item_id}, using reduced one")
+            return item
 
+        await repo.upsert_many({item_id: full_item.raw_data})
+        return await self._reload(item_id)
 
+    async def _reload(self, item_id: str) -> Optional[Item]:
+        """Get an item as stored, replacing a copy loaded by this session before."""
+        return await self.session.get(Item, item_id, populate_existing=True)
@@ -0,0 +1,103 @@
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from app.db.models import SearchSettings
+
+TOKEN_PATTERN = re.compile(r"\w+")
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue"})
+
+
+def normalize(text: str) -> str:
+    """Normalize German text for matching: case folded (ß becomes ss), umlauts spelled out, no accents."""
+    text = unicodedata.normalize("NFC", text).casefold().translate(UMLAUTS)
+    if text.isascii():
+        return text
+    # Drop remaining accents, e.g. é becomes e
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+class KeywordMatcher:
+    """Finds the searches whose item name terms all occur in an ad.
+
+    Every search is indexed under one anchor term, its longest one, which
+    tends to be the rarest. Matching an ad looks up the postings of each of
+    its distinct tokens and verifies the other terms of the candidates
+    against the token set, so it takes time linear in the ad text plus the
+    number of candidates, independent of the number of searches. Searches are
+    added and removed individually, `sync` only touches changed ones.
+    """
+
+    def __init__(self):
+        # Anchor term -> ids of the searches indexed under it
+        self._postings: Dict[str, Set[str]] = {}
+        # Search id -> (item name, anchor term, all terms)
+        self._searches: Dict[str, Tuple[str, str, FrozenSet[str]]] = {}
+        self.stats = {
+            "matched_texts": 0,
+            "candidates": 0,
+            "matches": 0,
+        }
+
+    def add(self, search_id: str, item_name: str) -> None:
+        """Index a search, replacing its previous item name."""
+        self.remove(search_id)
+        terms = frozenset(tokenize(item_name or ""))
+        if not terms:
+            return
+
+        anchor = max(terms, key=lambda term: (len(term), term))
+        self._postings.setdefault(anchor, set()).add(search_id)
+        self._searches[search_id] = (item_name, anchor, terms)
+
+    def remove(self, search_id: str) -> None:
+        entry = self._searches.pop(search_id, None)
+        if entry is None:
+            return
+
+        postings = self._postings[entry[1]]
+        postings.discard(search_id)
+        if not postings:
+            del self._postings[entry[1]]
+
+    def sync(self, searches: Iterable[SearchSettings]) -> Tuple[int, int]:
+        """Index exactly the given searches, returns the number of (re)indexed and removed ones."""
+        item_names = {search.id: search.item_name for search in searches}
+
+        removed = self._searches.keys() - item_names.keys()
+        for search_id in removed:
+            self.remove(search_id)
+
+        indexed = 0
+        for search_id, item_name in item_names.items():
+            entry = self._searches.get(search_id)
+            if entry is None or entry[0] != item_name:
+                self.add(search_id, item_name)
+                indexed += 1
+
+        return indexed, len(removed)
+
+    def match(self, text: str) -> Set[str]:
+        """Return ids of the searches matching the text."""
+        return self.match_tokens(tokenize(text))
+
+    def match_tokens(self, tokens: Iterable[str]) -> Set[str]:
+        """Like `match` for already normalized tokens."""
+        tokens = tokens if isinstance(tokens, (set, frozenset)) else set(tokens)
+        matches = set()
+        for token in tokens:
+            for search_id in self._postings.get(token, ()):
+                self.stats["candidates"] += 1
+                if self._searches[search_id][2] <= tokens:
+                    matches.add(search_id)
+
+        self.stats["matched_texts"] += 1
+        self.stats["matches"] += len(matches)
+        return matches
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "searches": len(self._searches), "anchors": len(self._postings)}
@@ -3,14 +3,14 @@ from aiogram import Bot
 from aiogram.exceptions import TelegramRetryAfter
 from loguru import logger
 
-from app.builders.message_builder import SingleKleinanzeigenItemMessageBuilder
+from app.kleinanzeigen.parsing_executor import parsing_executor
 from app.db.models import Notification, SearchSettings, User
 from app.db.repositories import (
-    ItemRepository, 
     NotificationRepository, 
     UserRepository,
 )
 from app.services import SearchSettingsService
+from app.services.item_service import ItemService
 from app.db.database import async_session
 
 
@@ -18,7 +18,12 @@ class NotificationService:
     """Service for sending notifications about new items to users."""
     
     def __init__(self):
-        pass
+        self.stats = {
+            "sent": 0,
+            "failed": 0,
+            "flood_waits": 0,
+            "flood_wait_seconds": 0.0,
+        }
     
     async def send_pending_notifications(self, bot: Bot):
         """Send all pending notifications to users."""
@@ -50,57 +55,69 @@ class NotificationService:
                     success = await self.send_notification(bot, user, notification, search_settings)
                 except TelegramRetryAfter as e:
                     logger.error(f"Flood limits exceeded. Retrying in {e.retry_after} seconds.")
+                    self.stats["flood_waits"] += 1
+                    self.stats["flood_wait_seconds"] += e.retry_after
                     await asyncio.sleep(e.retry_after)
                     success = False
                 except Exception as e:
                     logger.error(f"Error sending notification {notification.id} to user {user.user_id}: {e}")
                     success = False
                 
+                self.stats["sent" if success else "failed"] += 1
                 if success:
                     # Mark as sent
                     notification.mark_as_sent()
                     await notification_repo.save(notification)
     
     async def send_notification(self, bot: Bot, user: User, notification: Notification, search_settings: SearchSettings) -> bool:
-        """Send a single notification to a user."""
+        """Send a single notification to a user.
+
+        Raises `TelegramRetryAfter` when flood limits are hit, so the caller can wait.
+        """
+        message_text = None
         try:
             # Get the item
             async with async_session() as session:
-                repo = ItemRepository(session)
-                item = await repo.get_by_id(notification.item_id)
+                item_service = ItemService(session)
+                item = await item_service.get_full_by_id(notification.item_id)
 
             if not item:
                 logger.error(f"Item {notification.item_id} not found for notification {notification.id}")
                 return False
             
-            # Convert to KleinanzeigenItem for display
-            kleinanzeigen_item = item.to_kleinanzeigen_item()
-            
             # Create message
-            message_builder = SingleKleinanzeigenItemMessageBuilder(kleinanzeigen_item, search_settings)
+            message_text, message_media = parsing_executor.render_item_message(
+                item.raw_data,
+                search_settings.alias if search_settings is not None else None,
+            )
             
             # Send message with media if available
-            if message_builder.message_media:
+            if message_media:
                 # Send media group
                 await bot.send_media_group(
                     chat_id=user.user_id,
-                    media=message_builder.message_media
+                    media=message_media
                 )
             else:
                 # No media, send text only
                 await bot.send_message(
                     chat_id=user.user_id,
-                    text=message_builder.message_text,
+                    text=message_text,
                     parse_mode="Markdown"
                 )
             
             logger.debug(f"Notification {notification.id} sent to user {user.user_id}")
             return True
             
+        except TelegramRetryAfter:
+            raise
         except Exception as e:
-            logger.error(f"Error sending notification {notification.id} to user {user.user_id}: {e}, msg: {message_builder.message_text}")
+            logger.error(f"Error sending notification {notification.id} to user {user.user_id}: {e}, msg: {message_text}")
             return False
 
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
 
 # Create singleton instance
 notification_service = NotificationService() 
\ No newline at end of file
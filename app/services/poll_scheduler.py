@@ -0,0 +1,207 @@
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.services.incremental_fetcher import get_ad_date
+from app.services.scan_planner import ScanGroup
+
+HOURS_PER_DAY = 24
+# Observations lose half of their weight after this many seconds
+RATE_HALF_LIFE = 7 * 24 * 3600
+# Weight (in seconds of exposure) of the overall rate when estimating the rate of one hour of day
+HOURLY_PRIOR_SECONDS = 3600
+# Posting history older than this is not used for the first estimate
+MAX_HISTORY_SECONDS = 7 * 24 * 3600
+
+
+@dataclass
+class PostingRate:
+    """Decayed counts of posted ads and observed seconds, overall and per hour of day (UTC)."""
+    ads: float = 0.0
+    seconds: float = 0.0
+    hourly_ads: List[float] = field(default_factory=lambda: [0.0] * HOURS_PER_DAY)
+    hourly_seconds: List[float] = field(default_factory=lambda: [0.0] * HOURS_PER_DAY)
+    updated_at: Optional[float] = None
+
+    def observe(self, ad_times: Iterable[float], start: float, end: float) -> None:
+        """Record the ads posted between `start` and `end` (unix timestamps)."""
+        self._decay(end)
+
+        start = max(start, end - MAX_HISTORY_SECONDS)
+        self.seconds += max(0.0, end - start)
+        hour_start = start
+        while hour_start < end:
+            hour_end = min(end, (math.floor(hour_start / 3600) + 1) * 3600)
+            self.hourly_seconds[_get_hour(hour_start)] += hour_end - hour_start
+            hour_start = hour_end
+
+        for ad_time in ad_times:
+            if start <= ad_time <= end:
+                self.ads += 1
+                self.hourly_ads[_get_hour(ad_time)] += 1
+
+    def get_rate(self, at: float, prior_seconds: float) -> float:
+        """Estimate ads per second at the hour of day of `at`.
+
+        One ad per `prior_seconds` is assumed before anything is observed, so dormant
+        queries never get a rate of zero.
+        """
+        overall = (self.ads + 1) / (self.seconds + prior_seconds)
+        hour = _get_hour(at)
+        return (self.hourly_ads[hour] + HOURLY_PRIOR_SECONDS * overall) / (self.hourly_seconds[hour] + HOURLY_PRIOR_SECONDS)
+
+    def _decay(self, now: float) -> None:
+        if self.updated_at is not None and now > self.updated_at:
+            factor = 0.5 ** ((now - self.updated_at) / RATE_HALF_LIFE)
+            self.ads *= factor
+            self.seconds *= factor
+            self.hourly_ads = [ads * factor for ads in self.hourly_ads]
+            self.hourly_seconds = [seconds * factor for seconds in self.hourly_seconds]
+        self.updated_at = now
+
+
+@dataclass
+class QuerySchedule:
+    """Polling state of one upstream query."""
+    rate: PostingRate = field(default_factory=PostingRate)
+    weight: int = 1  # number of searches served by the query
+    score: float = 0.0
+    interval: Optional[float] = None
+    last_poll_at: Optional[float] = None
+    next_poll_at: float = 0.0
+
+
+class PollScheduler:
+    """Decides which upstream queries are due for polling.
+
+    The posting rate of every query is estimated from the ads it returned,
+    per hour of day. Intervals follow the square-root rule: for a fixed request
+    budget the mean detection delay over all searches is lowest when a query is
+    polled every `c / sqrt(searches * rate)` seconds. `c` is chosen so the
+    request rate equals polling every query every `base_interval` seconds, then
+    intervals are clamped to [`min_interval`, `max_interval`].
+    """
+
+    def __init__(self, kleinanzeigen_client, base_interval: float, min_interval: float, max_interval: float):
+        self.kleinanzeigen_client = kleinanzeigen_client
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.queries: Dict[tuple, QuerySchedule] = {}
+        self.search_keys: Dict[str, tuple] = {}
+        self._score_sum = 0.0
+        self.stats = {
+            "due": 0,
+            "skipped": 0,
+        }
+
+    def get_due_groups(self, groups: List[ScanGroup], now: Optional[float] = None) -> List[ScanGroup]:
+        """Return the groups which should be polled now."""
+        now = time.time() if now is None else now
+        new_groups = self.update_groups(groups)
+        # Groups with searches added since the last update are polled right away
+        due = [
+            group for group in groups
+            if id(group) in new_groups or self.get_next_poll_at(group.key) <= now
+        ]
+
+        self.stats["due"] += len(due)
+        self.stats["skipped"] += len(groups) - len(due)
+        return due
+
+    def update_groups(self, groups: List[ScanGroup]) -> Set[int]:
+        """Register the current groups and forget queries no search uses anymore.
+
+        Returns ids of the groups which got searches since the last update.
+        """
+        keys = set()
+        search_keys = {}
+        new_groups = set()
+        for group in groups:
+            key = group.key
+            keys.add(key)
+            for search in group.searches:
+                search_keys[search.id] = key
+                if search.id not in self.search_keys:
+                    new_groups.add(id(group))
+
+            schedule = self.queries.get(key)
+            if schedule is None:
+                schedule = self.queries[key] = QuerySchedule()
+            schedule.weight = len(group.searches)
+
+        for key in self.queries.keys() - keys:
+            self._score_sum -= self.queries.pop(key).score
+        self.search_keys = search_keys
+
+        return new_groups
+
+    def get_next_poll_at(self, key: tuple) -> float:
+        schedule = self.queries.get(key)
+        return schedule.next_poll_at if schedule is not None else 0.0
+
+    def record_poll(self, key: tuple, raw_ads: List[dict], is_initial: bool, now: Optional[float] = None) -> None:
+        """Update the rate estimate of a query with the ads it returned and schedule its next poll.
+
+        `raw_ads` are the ads newer than the last poll, or the first page of the
+        query if `is_initial`, in which case their post dates are the only history.
+        """
+        now = time.time() if now is None else now
+        schedule = self.queries.get(key)
+        if schedule is None:
+            schedule = self.queries[key] = QuerySchedule()
+
+        ad_times = [ad_at.replace(tzinfo=timezone.utc).timestamp() for ad_at in map(get_ad_date, raw_ads) if ad_at is not None]
+        if is_initial or schedule.last_poll_at is None:
+            if len(ad_times) > 1:
+                # The oldest ad only marks where the observed history starts
+                oldest = min(ad_times)
+                ad_times.remove(oldest)
+                schedule.rate.observe(ad_times, oldest, now)
+        else:
+            schedule.rate.observe(ad_times, schedule.last_poll_at, now)
+
+        schedule.last_poll_at = now
+        self._update_score(schedule, now)
+        schedule.interval = self._get_interval(schedule)
+        schedule.next_poll_at = now + schedule.interval
+
+    def record_failure(self, key: tuple, now: Optional[float] = None) -> None:
+        """Retry a query which could not be fetched after the minimum interval."""
+        now = time.time() if now is None else now
+        schedule = self.queries.get(key)
+        if schedule is not None:
+            schedule.next_poll_at = now + self.min_interval
+
+    def get_interval(self, search_id: str) -> Optional[float]:
+        """Return the current polling interval of a search in seconds, None if it was not polled yet."""
+        schedule = self.queries.get(self.search_keys.get(search_id))
+        return schedule.interval if schedule is not None else None
+
+    def get_stats(self) -> dict:
+        intervals = sorted(schedule.interval for schedule in self.queries.values() if schedule.interval is not None)
+        stats = {**self.stats, "queries": len(self.queries)}
+        if intervals:
+            stats.update({
+                "min_interval": round(intervals[0], 1),
+                "median_interval": round(intervals[len(intervals) // 2], 1),
+                "max_interval": round(intervals[-1], 1),
+            })
+        return stats
+
+    def _update_score(self, schedule: QuerySchedule, now: float) -> None:
+        score = math.sqrt(schedule.weight * schedule.rate.get_rate(now, prior_seconds=self.max_interval))
+        self._score_sum += score - schedule.score
+        schedule.score = score
+
+    def _get_interval(self, schedule: QuerySchedule) -> float:
+        # Budget: every known query polled once per base interval
+        budget = len(self.queries) / self.base_interval
+        interval = self._score_sum / budget / schedule.score if schedule.score > 0 else self.max_interval
+        return max(self.min_interval, min(self.max_interval, interval))
+
+
+def _get_hour(timestamp: float) -> int:
+    return datetime.fromtimestamp(timestamp, timezone.utc).hour
@@ -0,0 +1,69 @@
+import hashlib
+from collections import OrderedDict
+from typing import Iterable, List, Set, Tuple
+
+
+class ResponseFingerprintCache:
+    """Remembers the last response of every upstream query.
+
+    A response is fingerprinted by its ordered ad ids. When the same query returns
+    the same fingerprint, only searches which have not consumed that response yet
+    have to parse, deduplicate and persist it.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[str, Set[str]]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+        }
+
+    @staticmethod
+    def get_fingerprint(raw_ads: List[dict]) -> str:
+        ad_ids = "\n".join(str(ad.get("id")) for ad in raw_ads)
+        return hashlib.sha1(ad_ids.encode()).hexdigest()
+
+    def is_consumed(self, key: tuple, search_ids: Iterable[str]) -> bool:
+        """Check whether all given searches have consumed the last response of the query."""
+        entry = self._entries.get(key)
+        return entry is not None and set(search_ids) <= entry[1]
+
+    def get_unconsumed(self, key: tuple, fingerprint: str, search_ids: Iterable[str]) -> Set[str]:
+        """Return searches which still have to process the response, counting a hit if none."""
+        entry = self._entries.get(key)
+        unconsumed = set(search_ids)
+        if entry is not None and entry[0] == fingerprint:
+            unconsumed -= entry[1]
+
+        if not unconsumed:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        else:
+            self.stats["misses"] += 1
+
+        return unconsumed
+
+    def mark_unchanged(self, key: tuple, not_modified: bool = False) -> None:
+        """Count a response known to be unchanged without comparing fingerprints."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        if not_modified:
+            self.stats["not_modified"] += 1
+
+    def update(self, key: tuple, fingerprint: str, search_ids: Iterable[str]) -> None:
+        """Store the fingerprint of a processed response and the searches which consumed it."""
+        entry = self._entries.get(key)
+        consumed = set(search_ids)
+        if entry is not None and entry[0] == fingerprint:
+            consumed |= entry[1]
+
+        self._entries[key] = (fingerprint, consumed)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "entries": len(self._entries)}
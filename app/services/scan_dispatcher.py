@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config.settings import settings
+from app.services.scan_planner import ScanGroup
+from app.services.scan_service import ScanService, scan_service as default_scan_service
+
+
+class ScanDispatcher:
+    """Spreads scans of the upstream queries evenly over the polling interval.
+
+    Every query has one entry in a heap ordered by due time. The first scan of
+    a query gets a phase offset within the interval derived from its params, and
+    following scans keep that phase, so requests go out at a steady rate instead
+    of a burst at the start of every cycle. Scheduling a scan is O(log n); active
+    searches are reloaded and regrouped every `refresh_interval` seconds.
+    """
+
+    def __init__(self, scan_service: ScanService, interval: float, refresh_interval: float):
+        self.scan_service = scan_service
+        self.interval = interval
+        self.refresh_interval = refresh_interval
+        self.groups: Dict[tuple, ScanGroup] = {}
+        # (due at, sequence number, query key), entries with an outdated sequence number are skipped
+        self._heap: List[Tuple[float, int, tuple]] = []
+        self._sequences: Dict[tuple, int] = {}
+        self._next_sequence = 0
+        self._in_flight = set()
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+        self.running = False
+        self.stats = {
+            "dispatched": 0,
+            "stale_entries": 0,
+            "max_lag": 0.0,
+        }
+
+    async def run(self):
+        """Dispatch scans until `stop` is called."""
+        self.running = True
+        next_refresh_at = 0.0
+
+        while self.running:
+            now = time.time()
+            if now >= next_refresh_at:
+                await self.refresh()
+                next_refresh_at = now + self.refresh_interval
+
+            while self._heap and self._heap[0][0] <= now:
+                due_at, sequence, key = heapq.heappop(self._heap)
+                if self._sequences.get(key) != sequence:
+                    self.stats["stale_entries"] += 1
+                    continue
+
+                del self._sequences[key]
+                self._in_flight.add(key)
+                self.stats["dispatched"] += 1
+                self.stats["max_lag"] = max(self.stats["max_lag"], now - due_at)
+                task = asyncio.create_task(self._scan(key, due_at))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            wake_at = min(self._heap[0][0], next_refresh_at) if self._heap else next_refresh_at
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, wake_at - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+        await self._cancel_scans()
+
+    def stop(self):
+        self.running = False
+        self._wakeup.set()
+
+    async def refresh(self):
+        """Reload active searches and schedule queries which are not scheduled yet."""
+        try:
+            searches = await self.scan_service.load_active_searches()
+        except Exception as e:
+            logger.exception(f"💥 Error loading active searches: {e}")
+            return
+
+        self.update_groups(self.scan_service.plan(searches))
+        logger.debug(f"📊 Scan stats: {self.scan_service.get_stats()}, dispatcher: {self.get_stats()}")
+
+    def update_groups(self, groups: List[ScanGroup], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        is_first_update = not self.groups and not self._sequences
+
+        new_group_ids = set()
+        if self.scan_service.scheduler is not None:
+            new_group_ids = self.scan_service.scheduler.update_groups(groups)
+
+        self.groups = {group.key: group for group in groups}
+
+        for key in self._sequences.keys() - self.groups.keys():
+            del self._sequences[key]
+
+        for key, group in self.groups.items():
+            if key in self._in_flight:
+                continue
+            if key not in self._sequences:
+                # Spread queries over the interval on start, later ones are scanned right away
+                self._schedule(key, now + self._get_phase(key) * self.interval if is_first_update else now)
+            elif id(group) in new_group_ids:
+                self._schedule(key, now)
+
+        logger.info(f"🗓️ Scheduled {len(self.groups)} upstream queries")
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "max_lag": round(self.stats["max_lag"], 3),
+            "scheduled": len(self._sequences),
+            "in_flight": len(self._in_flight),
+            "heap_size": len(self._heap),
+        }
+
+    async def _cancel_scans(self):
+        """Abort scans still in flight, so the HTTP client and leases are not released under them."""
+        tasks = list(self._tasks)
+        if not tasks:
+            return
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"🛑 Cancelled {len(tasks)} scans in flight")
+
+    async def _scan(self, key: tuple, due_at: float):
+        group = self.groups.get(key)
+        try:
+            if group is not None:
+                await self.scan_service.scan_group(group)
+        except Exception as e:
+            logger.exception(f"💥 Error scanning query {group.params.get('q')}: {e}")
+        finally:
+            self._in_flight.discard(key)
+
+        if key in self.groups:
+            self._schedule(key, self._get_next_due_at(key, due_at))
+
+    def _get_next_due_at(self, key: tuple, due_at: float) -> float:
+        scheduler = self.scan_service.scheduler
+        if scheduler is not None:
+            next_due_at = scheduler.get_next_poll_at(key)
+            if next_due_at <= due_at:
+                # The scan did not get to record a poll
+                next_due_at = due_at + scheduler.min_interval
+        else:
+            # Keep the phase of the query
+            next_due_at = due_at + self.interval
+        return max(next_due_at, time.time())
+
+    def _schedule(self, key: tuple, due_at: float):
+        self._next_sequence += 1
+        self._sequences[key] = self._next_sequence
+        heapq.heappush(self._heap, (due_at, self._next_sequence, key))
+        self._wakeup.set()
+
+        # Drop stale entries once they make up most of the heap
+        if len(self._heap) > 2 * len(self._sequences) + 1024:
+            self._heap = [entry for entry in self._heap if self._sequences.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    @staticmethod
+    def _get_phase(key: tuple) -> float:
+        """Stable offset in [0, 1) of a query within the interval."""
+        return zlib.crc32(repr(key).encode()) / 2 ** 32
+
+
+# Create singleton instance
+scan_dispatcher = ScanDispatcher(
+    default_scan_service,
+    interval=settings.REQUEST_INTERVAL,
+    refresh_interval=settings.REQUEST_INTERVAL,
+)
@@ -0,0 +1,135 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from loguru import logger
+
+from app.db.models import SearchSettings
+from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient
+
+
+# Params which can be dropped from the upstream query and checked on parsed items instead
+LOCAL_FILTER_PARAMS = ("minPrice", "maxPrice", "pictureRequired", "posterType", "adType")
+
+
+@dataclass
+class ScanGroup:
+    """One upstream query shared by several searches."""
+    params: dict
+    searches: List[SearchSettings] = field(default_factory=list)
+    # Newest ads of a category and location, routed to the searches locally
+    is_feed: bool = False
+    # Identity of the query for per-query state, unlike `params` it does not change
+    # with the widened filters when searches join, leave or change their constraints
+    key: tuple = ()
+
+
+class ScanPlanner:
+    """Groups searches into as few upstream queries as possible.
+
+    Searches which differ only in price bounds, picture requirement, poster type
+    or ad type share one widened query, and the dropped filters are applied
+    locally to the parsed items of every search by `SearchFilterEngine`.
+    """
+
+    def __init__(self, kleinanzeigen_client: KleinanzeigenClient, merge_searches: bool = True):
+        self.kleinanzeigen_client = kleinanzeigen_client
+        self.merge_searches = merge_searches
+        # Counts of the latest plan, plans are rebuilt on every refresh of the searches
+        self.stats = {
+            "plans": 0,
+            "searches": 0,
+            "upstream_requests": 0,
+            "saved_requests": 0,
+        }
+
+    def plan(self, searches: List[SearchSettings], size: int) -> List[ScanGroup]:
+        """Build the list of upstream queries needed to serve all searches."""
+        groups: Dict[tuple, ScanGroup] = {}
+
+        for search in searches:
+            params = self.kleinanzeigen_client.get_params(search, size=size)
+            group_params = params
+            if self.merge_searches:
+                group_params = {k: v for k, v in params.items() if k not in LOCAL_FILTER_PARAMS}
+
+            key = self.kleinanzeigen_client.get_params_key(group_params)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = ScanGroup(params=group_params, key=key)
+            group.searches.append(search)
+
+        if self.merge_searches:
+            for group in groups.values():
+                group.params.update(self._get_widened_params(group.searches))
+
+        saved_requests = self._record_plan(searches, groups)
+        logger.info(f"🔗 Planned {len(searches)} searches into {len(groups)} upstream requests (saved {saved_requests})")
+
+        return list(groups.values())
+
+    def plan_feeds(self, searches: List[SearchSettings], size: int) -> List[ScanGroup]:
+        """Build one upstream feed per category and location serving all searches.
+
+        A feed covers the largest radius of its searches, the number of upstream
+        requests depends on the categories and locations in use only.
+        """
+        groups: Dict[tuple, ScanGroup] = {}
+        for search in searches:
+            feed = (search.category_id, search.location_id)
+            group = groups.get(feed)
+            if group is None:
+                group = groups[feed] = ScanGroup(params={}, is_feed=True)
+            group.searches.append(search)
+
+        for (category_id, location_id), group in groups.items():
+            radii = [search.radius_km for search in group.searches if search.radius_km is not None]
+            group.params = self.kleinanzeigen_client.get_feed_params(
+                category_id, location_id, max(radii) if radii else None, size=size
+            )
+            # The radius follows the searches of the feed
+            group.key = self.kleinanzeigen_client.get_params_key(
+                self.kleinanzeigen_client.get_feed_params(category_id, location_id, None, size=size)
+            )
+
+        saved_requests = self._record_plan(searches, groups)
+        logger.info(f"🔗 Planned {len(searches)} searches into {len(groups)} upstream feeds (saved {saved_requests})")
+
+        return list(groups.values())
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+    def _record_plan(self, searches: List[SearchSettings], groups: Dict[tuple, ScanGroup]) -> int:
+        """Store the counts of a new plan, returns the number of requests saved per scan of all searches."""
+        saved_requests = len(searches) - len(groups)
+        self.stats["plans"] += 1
+        self.stats["searches"] = len(searches)
+        self.stats["upstream_requests"] = len(groups)
+        self.stats["saved_requests"] = saved_requests
+        return saved_requests
+
+    @staticmethod
+    def _get_widened_params(searches: List[SearchSettings]) -> dict:
+        """Build the loosest upstream filters still covering every search of the group."""
+        params = {
+            "pictureRequired": str(all(search.is_picture_required for search in searches)).lower(),
+        }
+
+        lowest_prices = [search.lowest_price for search in searches]
+        if None not in lowest_prices:
+            params["minPrice"] = str(min(lowest_prices))
+
+        highest_prices = [search.highest_price for search in searches]
+        if None not in highest_prices:
+            params["maxPrice"] = str(max(highest_prices))
+
+        ad_types = {search.ad_type for search in searches}
+        if len(ad_types) == 1 and None not in ad_types:
+            params["adType"] = ad_types.pop().name
+
+        poster_types = {search.poster_type for search in searches}
+        if len(poster_types) == 1 and None not in poster_types:
+            params["posterType"] = poster_types.pop().name
+
+        return params
+
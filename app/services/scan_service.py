@@ -1,72 +1,375 @@
 import asyncio
+import os
+import socket
 from loguru import logger
 from asyncio import Semaphore
+from typing import Dict, List, Optional, Set
 
 from app.db.database import async_session
-from app.db.repositories import SearchSettingsRepository, NotificationRepository
-from app.services.item_service import ItemService
-from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient
+from app.db.repositories import ItemRepository, SearchSettingsRepository, NotificationRepository
+from app.services.scan_planner import ScanGroup, ScanPlanner
+from app.services.response_fingerprint_cache import ResponseFingerprintCache
+from app.services.firehose_router import FirehoseRouter
+from app.services.incremental_fetcher import IncrementalFetcher, Watermark
+from app.services.poll_scheduler import PollScheduler
+from app.services.search_filter import SearchFilterEngine
+from app.services.search_registry import search_registry
+from app.services.seen_ad_cache import SeenAdCache
+from app.kleinanzeigen.kleinanzeigen_client import KleinanzeigenClient, NOT_MODIFIED
+from app.kleinanzeigen.models import KleinanzeigenItem
+from app.kleinanzeigen.parsing_executor import parsing_executor
 from app.db.models import SearchSettings
 from app.config.settings import settings
 
+# Searches per query when warming the seen-ad cache
+SEEN_AD_WARM_BATCH_SIZE = 1000
+
+
 class ScanService:
     """Service for scanning Kleinanzeigen for new items."""
 
     def __init__(self, max_concurrent_tasks: int = 5):
         self.kleinanzeigen_client = KleinanzeigenClient.get_instance()
         self.semaphore = Semaphore(max_concurrent_tasks)
+        self.planner = ScanPlanner(
+            self.kleinanzeigen_client,
+            merge_searches=settings.KLEINANZEIGEN_MERGE_SEARCHES,
+        )
+        self.filters = SearchFilterEngine()
+        self.fingerprints = ResponseFingerprintCache()
+        self.seen_ads = SeenAdCache(max_entries=settings.SEEN_AD_CACHE_SIZE)
+        self.fetcher = IncrementalFetcher(
+            self.kleinanzeigen_client,
+            min_page_size=settings.KLEINANZEIGEN_MIN_ITEMS_PER_PAGE,
+            max_page_size=settings.KLEINANZEIGEN_MAX_ITEMS_PER_PAGE,
+            max_pages=settings.KLEINANZEIGEN_MAX_CATCH_UP_PAGES,
+        )
+        # Category/location feeds of the firehose mode get larger pages
+        self.feed_fetcher = IncrementalFetcher(
+            self.kleinanzeigen_client,
+            min_page_size=settings.KLEINANZEIGEN_MIN_ITEMS_PER_PAGE,
+            max_page_size=settings.FIREHOSE_MAX_ITEMS_PER_PAGE,
+            max_pages=settings.KLEINANZEIGEN_MAX_CATCH_UP_PAGES,
+        )
+        self.router = FirehoseRouter(self.kleinanzeigen_client, self.filters)
+        self.scheduler = PollScheduler(
+            self.kleinanzeigen_client,
+            base_interval=settings.REQUEST_INTERVAL,
+            min_interval=settings.MIN_REQUEST_INTERVAL,
+            max_interval=settings.MAX_REQUEST_INTERVAL,
+        ) if settings.ADAPTIVE_POLLING else None
+        # Replica id when active searches are split between scanner replicas with leases
+        self.lease_owner = get_scanner_id() if settings.SCANNER_LEASING else None
+        self.leased_ids: Set[str] = set()
 
     async def scan_for_new_items(self):
         """Main entrypoint to scan all active search settings."""
+        searches = await self.load_active_searches()
+
+        logger.info(f"🔍 Starting scan for {len(searches)} active search settings")
+
+        await self.scan_searches(searches)
+
+        logger.debug(f"📊 Scan stats: {self.get_stats()}")
+
+    async def load_active_searches(self) -> List[SearchSettings]:
+        """Load the active searches this process should scan."""
+        searches = await search_registry.get_active_searches()
+        if self.lease_owner is None:
+            return searches
+
         async with async_session() as session:
             search_repo = SearchSettingsRepository(session)
-            searches = await search_repo.get_active_searches()
+            leased_ids = set(await search_repo.lease_active_search_ids(self.lease_owner, ttl=settings.SCANNER_LEASE_TTL))
 
-        logger.info(f"🔍 Starting scan for {len(searches)} active search settings")
+        logger.info(f"🔒 Scanner {self.lease_owner} holds leases on {len(leased_ids)} searches")
+
+        # Searches taken over from another replica carry its was_used and watermarks in the database only
+        acquired_ids = leased_ids - self.leased_ids
+        self.leased_ids = leased_ids
+        if acquired_ids:
+            await search_registry.reload_many(list(acquired_ids))
+            searches = await search_registry.get_active_searches()
+
+        return [search for search in searches if search.id in leased_ids]
+
+    def enable_leasing(self, owner: Optional[str] = None):
+        self.lease_owner = owner or get_scanner_id()
+
+    async def warm_seen_ads(self):
+        """Fill the seen-ad cache with the newest notifications of the active searches."""
+        if self.seen_ads.max_entries <= 0:
+            return
+
+        searches = await search_registry.get_active_searches()
+        if not searches:
+            return
+
+        # Ads further down than a couple of pages are not returned again
+        limit_per_search = min(2 * settings.KLEINANZEIGEN_MAX_ITEMS_PER_PAGE, max(1, self.seen_ads.max_entries // len(searches)))
+        search_ids = [search.id for search in searches]
+        try:
+            async with async_session() as session:
+                notif_repo = NotificationRepository(session)
+                for i in range(0, len(search_ids), SEEN_AD_WARM_BATCH_SIZE):
+                    for search_id, item_id in await notif_repo.get_recent_item_ids(
+                        search_ids[i:i + SEEN_AD_WARM_BATCH_SIZE], limit_per_search
+                    ):
+                        self.seen_ads.add(search_id, [item_id])
+        except Exception as e:
+            logger.exception(f"💥 Error warming seen-ad cache: {e}")
+            return
+
+        stats = self.seen_ads.get_stats()
+        logger.info(f"Seen-ad cache warmed with {stats['entries']} ads ({stats['memory_bytes'] / 2 ** 20:.1f} MiB)")
+
+    async def release_leases(self):
+        """Hand the leased searches over to other replicas right away."""
+        if self.lease_owner is None:
+            return
+
+        async with async_session() as session:
+            await SearchSettingsRepository(session).release_leases(self.lease_owner)
+        self.leased_ids = set()
+        logger.info(f"🔓 Scanner {self.lease_owner} released its leases")
+
+    def plan(self, searches: List[SearchSettings]) -> List[ScanGroup]:
+        """Group searches into upstream queries, or category/location feeds in firehose mode."""
+        self.filters.retain(search.id for search in searches)
+        if settings.SCAN_MODE == "firehose":
+            return self.planner.plan_feeds(searches, size=settings.FIREHOSE_MAX_ITEMS_PER_PAGE)
+        return self.planner.plan(searches, size=settings.KLEINANZEIGEN_MAX_ITEMS_PER_PAGE)
+
+    def get_stats(self) -> dict:
+        """Return counters of the scan pipeline."""
+        return {
+            "connection_pool": self.kleinanzeigen_client.get_pool_stats(),
+            "rate_limiter": self.kleinanzeigen_client.rate_limiter.get_stats(),
+            "payload": self.kleinanzeigen_client.get_payload_stats(),
+            "planner": self.planner.get_stats(),
+            "filters": self.filters.get_stats(),
+            "fingerprints": self.fingerprints.get_stats(),
+            "seen_ads": self.seen_ads.get_stats(),
+            "fetcher": self.fetcher.get_stats(),
+            "feed_fetcher": self.feed_fetcher.get_stats(),
+            "router": self.router.get_stats(),
+            "parsing": parsing_executor.get_stats(),
+            "registry": search_registry.get_stats(),
+            "scheduler": self.scheduler.get_stats() if self.scheduler is not None else None,
+        }
+
+    def get_search_interval(self, search_id: str) -> Optional[float]:
+        """Return how often a search is currently polled in seconds."""
+        if self.scheduler is None:
+            return settings.REQUEST_INTERVAL
+        return self.scheduler.get_interval(search_id)
+
+    async def scan_searches(self, searches: List[SearchSettings]):
+        """Scan the given searches, sharing upstream requests between compatible searches."""
+        groups = self.plan(searches)
+        if self.scheduler is not None:
+            groups = self.scheduler.get_due_groups(groups)
 
-        tasks = [self._limited_process_search(search) for search in searches]
+        tasks = [self.scan_group(group) for group in groups]
         await asyncio.gather(*tasks)
 
-    async def _limited_process_search(self, search: SearchSettings):
-        """Semaphore-limited wrapper to control concurrency."""
+    async def scan_group(self, group: ScanGroup):
+        """Scan one upstream query, semaphore-limited to control concurrency."""
         async with self.semaphore:
-            await self._process_search(search)
+            await self._process_group(group)
 
-    async def _process_search(self, search: SearchSettings):
-        logger.info(f"➡️ Processing search: {search.alias} for {search.user_id}")
+    async def _process_group(self, group: ScanGroup):
+        """Fetch items once for a group of searches and fan them out.
+
+        Items of a feed are routed to the searches by their keywords, the items
+        of a search query only need the local filters of the searches.
+        """
+        key, params, searches, is_feed = group.key, group.params, group.searches, group.is_feed
+        search_ids = [search.id for search in searches]
+        label = f"feed {params.get('categoryId')}/{params.get('locationId')}" if is_feed else params.get("q")
+        fetcher = self.feed_fetcher if is_feed else self.fetcher
+
+        watermark = Watermark.oldest(Watermark.from_search(search) for search in searches)
+
+        try:
+            raw_ads = await fetcher.fetch(
+                key,
+                params,
+                watermark,
+                conditional=self.fingerprints.is_consumed(key, search_ids),
+                profile=settings.KLEINANZEIGEN_SCAN_PROFILE,
+            )
+        except Exception as e:
+            logger.exception(f"💥 Error fetching items for query {label}: {e}")
+            if self.scheduler is not None:
+                self.scheduler.record_failure(key)
+            return
+
+        if self.scheduler is not None:
+            if raw_ads is None:
+                self.scheduler.record_failure(key)
+            else:
+                self.scheduler.record_poll(key, raw_ads if raw_ads is not NOT_MODIFIED else [], is_initial=watermark is None)
+
+        if raw_ads is NOT_MODIFIED:
+            self.fingerprints.mark_unchanged(key, not_modified=True)
+            logger.debug(f"⏩ Upstream reported no changes for search: {label}")
+            return
+
+        if not raw_ads and watermark is not None:
+            self.fingerprints.mark_unchanged(key)
+            logger.debug(f"⏩ No ads newer than {watermark.ad_id} for search: {label}")
+            return
+
+        if not raw_ads:
+            logger.info(f"❌ No items found for search: {label}")
+            return
+
+        fingerprint = self.fingerprints.get_fingerprint(raw_ads)
+        unconsumed_search_ids = self.fingerprints.get_unconsumed(key, fingerprint, search_ids)
+        if not unconsumed_search_ids:
+            logger.debug(f"⏩ Unchanged response for search: {label}")
+            return
+
+        searches = [search for search in searches if search.id in unconsumed_search_ids]
+
+        items = await parsing_executor.parse_items(raw_ads)
+        logger.info(f"✅ Found {len(items)} items for search: {label} ({len(searches)} subscribed searches)")
+
+        consumed_search_ids = []
+        if is_feed:
+            await self.router.resolve_centers(searches)
+            items_by_search = self.router.route(searches, items, search_registry.matcher)
+        else:
+            items_by_search = self.filters.filter_items(searches, items)
+        for search in searches:
+            if not items_by_search[search.id]:
+                logger.debug(f"🟡 No items left for search {search.id} after local filtering")
+                consumed_search_ids.append(search.id)
+                del items_by_search[search.id]
 
         try:
-            items = await self.kleinanzeigen_client.fetch_items(search)
-            if not items:
-                logger.info(f"❌ No items found for search: {search.item_name}")
-                return
+            unseen_items_by_search = await self._get_unseen_items(
+                [search for search in searches if search.id in items_by_search],
+                items_by_search,
+            )
+        except Exception as e:
+            logger.exception(f"💥 Error deduplicating items for query {label}: {e}")
+            return
+
+        unseen_items = {item.id: item for search_items in unseen_items_by_search.values() for item in search_items}
+        try:
+            await self._store_items(list(unseen_items.values()))
+        except Exception as e:
+            logger.exception(f"💥 Error storing items for query {label}: {e}")
+            return
 
-            logger.info(f"✅ Found {len(items)} items for search: {search.item_name}")
+        for search in searches:
+            if search.id not in unseen_items_by_search:
+                continue
 
+            search_items = unseen_items_by_search[search.id]
+            skipped = len(items_by_search[search.id]) - len(search_items)
+            if skipped:
+                logger.debug(f"🟡 Skipped {skipped} items for search {search.id} (already scanned)")
+            if not search_items and search.was_used:
+                consumed_search_ids.append(search.id)
+                continue
+
+            if await self._process_search(search, search_items):
+                consumed_search_ids.append(search.id)
+
+        self.fingerprints.update(key, fingerprint, consumed_search_ids)
+        await self._advance_watermarks(
+            [search for search in searches if search.id in consumed_search_ids],
+            Watermark.from_raw_ad(raw_ads[0]),
+        )
+
+    async def _advance_watermarks(self, searches: List[SearchSettings], watermark: Watermark):
+        """Persist the newest ad seen by the searches."""
+        if not searches:
+            return
+
+        try:
             async with async_session() as session:
-                item_repo = ItemService(session)
-                notif_repo = NotificationRepository(session)
                 search_repo = SearchSettingsRepository(session)
+                await search_repo.update_watermarks(
+                    [search.id for search in searches],
+                    watermark.ad_id,
+                    watermark.ad_at,
+                )
+        except Exception as e:
+            logger.exception(f"💥 Error updating watermarks: {e}")
+            return
 
-                for klein_item in items:
-                    if await notif_repo.exists(klein_item.id, search.user_id, search.id):
-                        logger.debug(f"🟡 Skipped item {klein_item.title} {klein_item.id} (already scanned)")
-                        continue
+        for search in searches:
+            search.last_seen_ad_id = watermark.ad_id
+            search.last_seen_ad_at = watermark.ad_at
+
+    async def _get_unseen_items(
+        self, searches: List[SearchSettings], items_by_search: Dict[str, List[KleinanzeigenItem]]
+    ) -> Dict[str, List[KleinanzeigenItem]]:
+        """Drop the items the searches were already notified about.
 
-                    logger.info(f"🔔 Found new item {klein_item.title} {klein_item.id} for user {search.user_id}")
+        Items in the seen-ad cache are dropped right away, the rest are looked up
+        in one query for all searches.
+        """
+        candidate_ids = {
+            (search.user_id, search.id): self.seen_ads.filter_unseen(search.id, [item.id for item in items_by_search[search.id]])
+            for search in searches
+        }
 
-                    item = await item_repo.get_or_create_by_id(
-                        klein_item.id,
-                        klein_item.raw_data
-                    )
+        unseen_item_ids = candidate_ids
+        if any(candidate_ids.values()):
+            async with async_session() as session:
+                unseen_item_ids = await NotificationRepository(session).get_unseen_item_ids_for_searches(
+                    {key: item_ids for key, item_ids in candidate_ids.items() if item_ids}
+                )
+
+        unseen_items_by_search = {}
+        for search in searches:
+            key = (search.user_id, search.id)
+            unseen_ids = set(unseen_item_ids.get(key, ()))
+            # Cache misses which turned out to be notified already
+            self.seen_ads.add(search.id, [item_id for item_id in candidate_ids[key] if item_id not in unseen_ids])
+            unseen_items_by_search[search.id] = [item for item in items_by_search[search.id] if item.id in unseen_ids]
+        return unseen_items_by_search
+
+    async def _store_items(self, items: List[KleinanzeigenItem]):
+        """Upsert the items of a page in one statement, unchanged stored items are not rewritten."""
+        if not items:
+            return
+
+        async with async_session() as session:
+            result = await ItemRepository(session).upsert_many({item.id: item.raw_data for item in items})
+
+        if result.changed_ids:
+            logger.debug(f"✏️ Content of {len(result.changed_ids)} stored items changed: {result.changed_ids}")
+
+    async def _process_search(self, search: SearchSettings, items: List[KleinanzeigenItem]) -> bool:
+        """Create notifications of the new (already stored) items of a search."""
+        logger.info(f"➡️ Processing search: {search.alias} for {search.user_id}")
+
+        try:
+            async with async_session() as session:
+                notif_repo = NotificationRepository(session)
+                search_repo = SearchSettingsRepository(session)
 
-                    await notif_repo.create_notification(
-                        item_id=item.id,
-                        user_id=search.user_id,
-                        search_id=search.id,
-                        is_sent=not search.was_used
-                    )
+                notifications = await notif_repo.create_notifications(
+                    item_ids=[klein_item.id for klein_item in items],
+                    user_id=search.user_id,
+                    search_id=search.id,
+                    is_sent=not search.was_used
+                )
 
+                created_item_ids = {notification.item_id for notification in notifications}
+                for klein_item in items:
+                    if klein_item.id in created_item_ids:
+                        logger.info(f"🔔 Found new item {klein_item.title} {klein_item.id} for user {search.user_id}")
+                    else:
+                        logger.debug(f"🟡 Skipped item {klein_item.title} {klein_item.id} (created by a concurrent scan)")
+
+                self.seen_ads.add(search.id, [klein_item.id for klein_item in items])
 
                 if not search.was_used:
                     search.mark_as_used()
@@ -75,7 +378,14 @@ class ScanService:
 
         except Exception as e:
             logger.exception(f"💥 Error processing search {search.id}: {e}")
+            return False
+
+        return True
+
+
 
+def get_scanner_id() -> str:
+    return settings.SCANNER_ID or f"{socket.gethostname()}-{os.getpid()}"
 
 
 scan_service = ScanService(settings.KLEINANZEIGEN_CONCURRENT_REQUESTS_FOR_SCAN)
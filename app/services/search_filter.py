@@ -0,0 +1,267 @@
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from app.db.models import SearchSettings
+from app.kleinanzeigen.models import KleinanzeigenItem
+from app.services.keyword_matcher import TOKEN_PATTERN, normalize
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Longest title pattern accepted from users
+MAX_TITLE_PATTERN_LENGTH = 200
+# Unbounded quantifiers allowed in a title pattern, each one multiplies the possible backtracking
+MAX_TITLE_PATTERN_REPEATS = 2
+# Quantifiers up to this many repetitions count as bounded
+MAX_BOUNDED_REPEAT = 10
+# Longest part of a title a pattern is matched against, upstream titles are shorter
+MAX_MATCHED_TITLE_LENGTH = 100
+
+REPEAT_OPS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)} - {None}
+
+
+@dataclass
+class ItemFeatures:
+    """Fields of a parsed item the filters look at, extracted once per batch."""
+    item: KleinanzeigenItem
+    title: str
+    text: str  # normalized title and description
+    words: FrozenSet[str]
+    amount: Optional[float]
+    has_pictures: bool
+    poster_type: object
+    ad_type: object
+    age: Optional[float]  # seconds since the ad was posted
+
+    @classmethod
+    def from_item(cls, item: KleinanzeigenItem, now: float) -> "ItemFeatures":
+        title = item.title or ""
+        # Ads without a description have only their title
+        text = normalize(f"{title}\n{item.description}" if item.description else title)
+        return cls(
+            item=item,
+            title=title,
+            text=text,
+            words=frozenset(TOKEN_PATTERN.findall(text)),
+            amount=_get_price_amount(item),
+            has_pictures=bool(item.pictures),
+            poster_type=item.poster_type,
+            ad_type=item.ad_type,
+            age=now - item.ad_post_date.timestamp() if item.ad_post_date is not None else None,
+        )
+
+
+Check = Callable[[ItemFeatures], bool]
+
+
+class SearchFilter:
+    """Predicate over item features compiled from the constraints of one search.
+
+    Only constraints the search actually sets become checks, keywords are
+    split into words looked up in the word set of the item (phrases are
+    matched as substrings) and the title pattern is compiled once.
+    """
+
+    def __init__(self, search: SearchSettings):
+        self.signature = get_filter_signature(search)
+        self.checks: List[Check] = []
+
+        if search.lowest_price is not None:
+            lowest_price = search.lowest_price
+            self.checks.append(lambda f: f.amount is None or f.amount >= lowest_price)
+
+        if search.highest_price is not None:
+            highest_price = search.highest_price
+            self.checks.append(lambda f: f.amount is None or f.amount <= highest_price)
+
+        if search.is_picture_required:
+            self.checks.append(lambda f: f.has_pictures)
+
+        if search.poster_type is not None:
+            poster_type = search.poster_type
+            self.checks.append(lambda f: f.poster_type == poster_type)
+
+        if search.ad_type is not None:
+            ad_type = search.ad_type
+            self.checks.append(lambda f: f.ad_type == ad_type)
+
+        required_words, required_phrases = _split_phrases(parse_keywords(search.required_keywords))
+        if required_words:
+            self.checks.append(lambda f: required_words <= f.words)
+        if required_phrases:
+            self.checks.append(lambda f: all(phrase in f.text for phrase in required_phrases))
+
+        excluded_words, excluded_phrases = _split_phrases(parse_keywords(search.excluded_keywords))
+        if excluded_words:
+            self.checks.append(lambda f: excluded_words.isdisjoint(f.words))
+        if excluded_phrases:
+            self.checks.append(lambda f: not any(phrase in f.text for phrase in excluded_phrases))
+
+        if search.title_pattern:
+            try:
+                title_pattern = compile_title_pattern(search.title_pattern)
+            except ValueError as e:
+                logger.warning(f"Ignoring title pattern of search {search.id}: {e}")
+            else:
+                self.checks.append(lambda f: title_pattern.search(f.title[:MAX_MATCHED_TITLE_LENGTH]) is not None)
+
+        if search.max_ad_age_hours:
+            max_age = search.max_ad_age_hours * 3600
+            self.checks.append(lambda f: f.age is None or f.age <= max_age)
+
+    def __call__(self, features: ItemFeatures) -> bool:
+        for check in self.checks:
+            if not check(features):
+                return False
+        return True
+
+
+class SearchFilterEngine:
+    """Applies the compiled filters of many searches to a batch of parsed items.
+
+    Item features are extracted once per batch and shared by all searches,
+    compiled filters are cached per search and rebuilt when its constraints
+    change.
+    """
+
+    def __init__(self):
+        self._filters: Dict[str, SearchFilter] = {}
+        self.stats = {
+            "compiled": 0,
+            "evaluated": 0,
+            "rejected": 0,
+        }
+
+    def get_filter(self, search: SearchSettings) -> SearchFilter:
+        search_filter = self._filters.get(search.id)
+        if search_filter is None or search_filter.signature != get_filter_signature(search):
+            search_filter = self._filters[search.id] = SearchFilter(search)
+            self.stats["compiled"] += 1
+        return search_filter
+
+    def filter_items(
+        self, searches: List[SearchSettings], items: List[KleinanzeigenItem], now: Optional[float] = None
+    ) -> Dict[str, List[KleinanzeigenItem]]:
+        """Return the items matching the constraints of every search."""
+        now = time.time() if now is None else now
+        features = [ItemFeatures.from_item(item, now) for item in items]
+
+        items_by_search = {}
+        for search in searches:
+            search_filter = self.get_filter(search)
+            items_by_search[search.id] = [f.item for f in features if search_filter(f)]
+            self.stats["rejected"] += len(features) - len(items_by_search[search.id])
+        self.stats["evaluated"] += len(searches) * len(features)
+
+        return items_by_search
+
+    def retain(self, search_ids: Iterable[str]) -> None:
+        """Drop compiled filters of searches which are not scanned anymore."""
+        search_ids = set(search_ids)
+        for search_id in self._filters.keys() - search_ids:
+            del self._filters[search_id]
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "filters": len(self._filters)}
+
+
+def get_filter_signature(search: SearchSettings) -> tuple:
+    return (
+        search.lowest_price,
+        search.highest_price,
+        search.is_picture_required,
+        search.poster_type,
+        search.ad_type,
+        search.required_keywords,
+        search.excluded_keywords,
+        search.title_pattern,
+        search.max_ad_age_hours,
+    )
+
+
+def compile_title_pattern(pattern: str) -> re.Pattern:
+    """Compile a title pattern of a user, rejecting patterns which can backtrack catastrophically.
+
+    Patterns run on the event loop for every scanned ad, and the regex engine
+    backtracks: nested quantifiers like `(\\w+\\s?)*`, alternatives inside a
+    repeated group and backreferences can take exponential time, and every
+    unbounded quantifier multiplies the work. Raises ValueError with a message
+    for the user.
+    """
+    if len(pattern) > MAX_TITLE_PATTERN_LENGTH:
+        raise ValueError(f"the pattern is longer than {MAX_TITLE_PATTERN_LENGTH} characters")
+
+    try:
+        parsed = sre_parse.parse(pattern)
+        compiled = re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"invalid regular expression: {e}") from e
+
+    if _count_unbounded_repeats(parsed, in_repeat=False) > MAX_TITLE_PATTERN_REPEATS:
+        raise ValueError(f"at most {MAX_TITLE_PATTERN_REPEATS} unbounded quantifiers (*, + or {{n,}}) are supported")
+    return compiled
+
+
+def _count_unbounded_repeats(items, in_repeat: bool) -> int:
+    repeats = 0
+    for op, av in items:
+        if op in REPEAT_OPS:
+            _, max_count, body = av
+            is_repeated = max_count > 1
+            if is_repeated and in_repeat:
+                raise ValueError("nested quantifiers like (a+)* are not supported")
+            if max_count > MAX_BOUNDED_REPEAT:
+                repeats += 1
+            repeats += _count_unbounded_repeats(body, in_repeat or is_repeated)
+        elif op is sre_parse.BRANCH:
+            if in_repeat:
+                raise ValueError("alternatives inside a repeated group like (a|b)+ are not supported")
+            repeats += sum(_count_unbounded_repeats(branch, in_repeat) for branch in av[1])
+        elif op is sre_parse.SUBPATTERN:
+            repeats += _count_unbounded_repeats(av[-1], in_repeat)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            repeats += _count_unbounded_repeats(av[1], in_repeat)
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            repeats += _count_unbounded_repeats(av, in_repeat)
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            raise ValueError("backreferences are not supported")
+    return repeats
+
+
+def parse_keywords(keywords: Optional[str]) -> List[str]:
+    """Split comma separated keywords, normalized like the text of items."""
+    if not keywords:
+        return []
+    return [" ".join(normalize(keyword).split()) for keyword in keywords.split(",") if keyword.strip()]
+
+
+def split_keyword_input(text: str) -> Tuple[str, str]:
+    """Split user input like `iphone, 128gb, -defekt` into required and excluded keywords."""
+    required, excluded = [], []
+    for keyword in parse_keywords(text):
+        if keyword.startswith("-"):
+            if keyword[1:].strip():
+                excluded.append(keyword[1:].strip())
+        else:
+            required.append(keyword)
+    return ", ".join(required), ", ".join(excluded)
+
+
+def _split_phrases(keywords: List[str]) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    """Separate single words, looked up in the word set, from phrases matched as substrings."""
+    words = frozenset(keyword for keyword in keywords if TOKEN_PATTERN.fullmatch(keyword))
+    phrases = tuple(keyword for keyword in keywords if keyword not in words)
+    return words, phrases
+
+
+def _get_price_amount(item: KleinanzeigenItem) -> Optional[float]:
+    try:
+        return float(item.price.amount)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import asyncpg
+from loguru import logger
+
+from app.config.settings import settings
+from app.db.database import async_session
+from app.db.models import SearchSettings
+from app.db.repositories import SearchSettingsRepository
+from app.db.repositories.search_settings_repository import SEARCH_CHANGES_CHANNEL
+from app.services.keyword_matcher import KeywordMatcher
+
+# Searches per query when reloading many searches
+RELOAD_BATCH_SIZE = 1000
+
+
+class SearchRegistry:
+    """In-memory registry of the active searches.
+
+    Loaded once, then kept current by `SearchSettingsService`, which announces
+    changed searches with NOTIFY. The registry LISTENs for those announcements,
+    its own process's included, and reloads everything every `resync_interval`
+    seconds in case one was missed (e.g. while reconnecting). While it is not
+    listening, the service reloads changed searches here directly.
+    The keyword matcher over the item names of the searches is updated along.
+    """
+
+    def __init__(self, resync_interval: int):
+        self.resync_interval = resync_interval
+        self.searches: Dict[str, SearchSettings] = {}
+        self.matcher = KeywordMatcher()
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self._connection: Optional[asyncpg.Connection] = None
+        self._resync_task: Optional[asyncio.Task] = None
+        self._reload_tasks = set()
+        self.stats = {
+            "full_loads": 0,
+            "reloads": 0,
+            "notifications": 0,
+        }
+
+    async def start(self):
+        """Load the searches and follow changes from other processes."""
+        await self.load()
+        await self._listen()
+        if self._resync_task is None:
+            self._resync_task = asyncio.create_task(self._resync_forever())
+
+    async def stop(self):
+        if self._resync_task is not None:
+            self._resync_task.cancel()
+            self._resync_task = None
+
+        if self.is_listening():
+            await self._connection.close()
+        self._connection = None
+
+    async def get_active_searches(self) -> List[SearchSettings]:
+        if self.loaded_at is None:
+            await self.load()
+        return list(self.searches.values())
+
+    async def load(self):
+        """Replace the registry with all active searches from the database."""
+        async with async_session() as session:
+            searches = await SearchSettingsRepository(session).get_active_searches()
+
+        self.searches = {search.id: search for search in searches}
+        self.matcher.sync(searches)
+        self.version += 1
+        self.loaded_at = time.monotonic()
+        self.stats["full_loads"] += 1
+        logger.info(f"📇 Loaded {len(self.searches)} active searches")
+
+    async def reload(self, search_id: str):
+        """Reload one search after it was created, changed or deleted."""
+        if self.loaded_at is None:
+            return
+
+        async with async_session() as session:
+            search = await SearchSettingsRepository(session).get_by_id(search_id)
+
+        if search is not None and search.is_active:
+            self.searches[search_id] = search
+            self.matcher.add(search_id, search.item_name)
+        else:
+            self.searches.pop(search_id, None)
+            self.matcher.remove(search_id)
+        self.version += 1
+        self.stats["reloads"] += 1
+
+    async def reload_many(self, search_ids: List[str]):
+        """Reload searches whose rows may have been changed by another scanner, e.g. after taking over their leases.
+
+        Scanners save `was_used` and watermarks without announcing them, so
+        the registry copies of searches scanned elsewhere are outdated.
+        """
+        if self.loaded_at is None or not search_ids:
+            return
+
+        searches = []
+        async with async_session() as session:
+            search_repo = SearchSettingsRepository(session)
+            for i in range(0, len(search_ids), RELOAD_BATCH_SIZE):
+                searches.extend(await search_repo.get_active_by_ids(search_ids[i:i + RELOAD_BATCH_SIZE]))
+
+        reloaded_ids = set()
+        for search in searches:
+            self.searches[search.id] = search
+            self.matcher.add(search.id, search.item_name)
+            reloaded_ids.add(search.id)
+        for search_id in set(search_ids) - reloaded_ids:
+            self.searches.pop(search_id, None)
+            self.matcher.remove(search_id)
+        self.version += 1
+        self.stats["reloads"] += len(search_ids)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "searches": len(self.searches),
+            "version": self.version,
+            "matcher": self.matcher.get_stats(),
+            "listening": self.is_listening(),
+        }
+
+    def is_listening(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def _listen(self):
+        if self.is_listening():
+            return
+
+        try:
+            self._connection = await asyncpg.connect(settings.database_url.replace("postgresql+asyncpg://", "postgresql://"))
+            await self._connection.add_listener(SEARCH_CHANGES_CHANNEL, self._on_notification)
+        except Exception as e:
+            logger.error(f"Error listening for search changes, relying on resyncs: {e}")
+            self._connection = None
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self.stats["notifications"] += 1
+        task = asyncio.create_task(self._reload_safely(payload))
+        self._reload_tasks.add(task)
+        task.add_done_callback(self._reload_tasks.discard)
+
+    async def _reload_safely(self, search_id: str):
+        try:
+            await self.reload(search_id)
+        except Exception as e:
+            logger.error(f"Error reloading search {search_id}: {e}")
+
+    async def _resync_forever(self):
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                await self.load()
+                await self._listen()
+            except Exception as e:
+                logger.error(f"Error resyncing active searches: {e}")
+
+
+# Create singleton instance
+search_registry = SearchRegistry(resync_interval=settings.SEARCH_REGISTRY_RESYNC_INTERVAL)
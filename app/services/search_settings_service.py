@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import SearchSettings
 from app.db.repositories import SearchSettingsRepository
+from app.services.search_registry import search_registry
 
 from loguru import logger
 
@@ -15,6 +16,7 @@ class SearchSettingsService:
     async def create(self, search_settings: SearchSettings) -> SearchSettings:
         repo = SearchSettingsRepository(self.session)
         search_settings = await repo.save(search_settings)
+        await self._publish_change(search_settings.id)
 
         return search_settings
     
@@ -33,6 +35,7 @@ class SearchSettingsService:
     async def delete(self, search_id: str) -> bool:
         repo = SearchSettingsRepository(self.session)
         result = await repo.delete(search_id)
+        await self._publish_change(search_id)
 
         return result
 
@@ -41,5 +44,16 @@ class SearchSettingsService:
         search_settings = await repo.get_by_id(search_id)
         search_settings.is_active = not search_settings.is_active
         await repo.update(search_settings)
+        await self._publish_change(search_id)
 
         return search_settings.is_active
+
+    async def _publish_change(self, search_id: str):
+        """Update the active search registry of this and other processes."""
+        try:
+            await SearchSettingsRepository(self.session).notify_changed(search_id)
+            # A listening registry reloads the search on its own notification
+            if not search_registry.is_listening():
+                await search_registry.reload(search_id)
+        except Exception as e:
+            logger.error(f"Error publishing change of search {search_id}: {e}")
@@ -0,0 +1,74 @@
+import sys
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+
+class SeenAdCache:
+    """Remembers recently seen ad ids of every search.
+
+    Sits in front of the notifications table: ads found here were already
+    processed by the search, so only the remaining ones have to be looked up
+    in the database. Holds at most `max_entries` (search id, ad id) pairs and
+    evicts the least recently seen ones first. A size of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._key_bytes = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+    def filter_unseen(self, search_id: str, ad_ids: Iterable[str]) -> List[str]:
+        """Return the ad ids not known to be seen by the search."""
+        unseen = []
+        for ad_id in ad_ids:
+            key = (search_id, ad_id)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            else:
+                unseen.append(ad_id)
+                self.stats["misses"] += 1
+        return unseen
+
+    def add(self, search_id: str, ad_ids: Iterable[str]) -> None:
+        """Remember ads the search has processed, the last ones are kept longest."""
+        if self.max_entries <= 0:
+            return
+
+        for ad_id in ad_ids:
+            key = (search_id, ad_id)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                continue
+
+            self._entries[key] = None
+            self._key_bytes += self._get_key_size(key)
+            if len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._key_bytes -= self._get_key_size(evicted)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._key_bytes = 0
+
+    def get_memory_usage(self) -> int:
+        """Approximate size of the cache in bytes, search id strings are shared with the searches."""
+        return sys.getsizeof(self._entries) + self._key_bytes
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": self.get_memory_usage(),
+        }
+
+    @staticmethod
+    def _get_key_size(key: Tuple[str, str]) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(key[1])
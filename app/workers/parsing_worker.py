@@ -4,6 +4,7 @@ from datetime import datetime
 from loguru import logger
 
 from app.config.settings import settings
+from app.services.scan_dispatcher import scan_dispatcher
 from app.services.scan_service import scan_service
 
 
@@ -11,9 +12,12 @@ class ParsingWorker:
     """Worker to periodically parse Kleinanzeigen.de for new items."""
     
     def __init__(self):
-        self.interval = settings.REQUEST_INTERVAL
+        # With adaptive polling every cycle only scans the searches which are due
+        self.interval = settings.MIN_REQUEST_INTERVAL if settings.ADAPTIVE_POLLING else settings.REQUEST_INTERVAL
         self.running = False
         self.task = None
+        # Set by stop() to cut short the sleeps between cycles
+        self._stopping = asyncio.Event()
     
     async def run_once(self):
         """Run a single parsing cycle."""
@@ -29,8 +33,16 @@ class ParsingWorker:
     
     async def run_forever(self):
         """Run the parsing worker in an infinite loop."""
-        await asyncio.sleep(3) # waiting for the bot to start
         self.running = True
+        self._stopping.clear()
+        await self._sleep(3) # waiting for the bot to start
+        if not self.running:
+            return
+
+        if settings.STAGGERED_SCANS:
+            logger.info("Dispatching staggered scans")
+            await scan_dispatcher.run()
+            return
         
         while self.running:
             start_time = datetime.now()
@@ -43,7 +55,13 @@ class ParsingWorker:
             
             if sleep_time > 0:
                 logger.debug(f"Sleeping for {sleep_time:.1f} seconds")
-                await asyncio.sleep(sleep_time)
+                await self._sleep(sleep_time)
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
     
     def start(self):
         """Start the parsing worker."""
@@ -54,12 +72,21 @@ class ParsingWorker:
             logger.warning("Parsing worker already running")
     
     def stop(self):
-        """Stop the parsing worker."""
-        if self.task and not self.task.done():
-            self.running = False
-            logger.info("Parsing worker stopping...")
-        else:
+        """Stop the parsing worker, whether it runs as a task or `run_forever` is awaited directly."""
+        if not self.running:
             logger.warning("Parsing worker not running")
+            return
+
+        self.running = False
+        self._stopping.set()
+        scan_dispatcher.stop()
+        logger.info("Parsing worker stopping...")
+
+    async def wait_stopped(self):
+        """Wait until the task started by `start` has finished its cycle or cancelled its scans."""
+        if self.task is not None:
+            await self.task
+            logger.info("Parsing worker stopped")
 
 
 # Singleton instance
@@ -0,0 +1,323 @@
+"""
+Local stand-in for the Kleinanzeigen API used for load and latency benchmarks.
+
+Serves /ads.json, /ads/{id}.json and /locations.json in the shapes parsed by
+KleinanzeigenClient. Ads are generated per query with Poisson arrivals, responses
+get a synthetic latency, and errors and bursts of 429 responses can be injected.
+Requests without a query return the newest ads of the first `--feed-queries`
+queries, like the category feed of the firehose scan mode.
+
+Usage:
+    python -m benchmarks.fake_kleinanzeigen_api --port 8081 --ad-rate 0.05 --latency-mean 0.05
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import pytz
+from aiohttp import web
+
+ADS_KEY = "{http://www.ebayclassifiedsgroup.com/schema/ad/v1}ads"
+AD_KEY = "{http://www.ebayclassifiedsgroup.com/schema/ad/v1}ad"
+LOCATIONS_KEY = "{http://www.ebayclassifiedsgroup.com/schema/location/v1}locations"
+
+BERLIN_TZ = pytz.timezone("Europe/Berlin")
+
+LOCATIONS = [
+    ("3331", "10115", "Berlin", "52.52", "13.40"),
+    ("2856", "20095", "Hamburg", "53.55", "10.00"),
+    ("6411", "80331", "München", "48.14", "11.58"),
+    ("945", "50667", "Köln", "50.94", "6.96"),
+    ("4292", "60311", "Frankfurt am Main", "50.11", "8.68"),
+    ("9183", "70173", "Stuttgart", "48.78", "9.18"),
+    ("1723", "40213", "Düsseldorf", "51.23", "6.78"),
+    ("5012", "04109", "Leipzig", "51.34", "12.37"),
+]
+
+
+def get_query(index: int) -> str:
+    """Name of the n-th synthetic query."""
+    return f"query{index}"
+
+
+class FakeKleinanzeigenApi:
+    """Synthetic Kleinanzeigen API."""
+
+    def __init__(
+        self,
+        ad_rate: float = 0.05,
+        ad_rate_skew: float = 0.0,
+        latency_mean: float = 0.05,
+        latency_distribution: str = "exponential",
+        error_rate: float = 0.0,
+        throttle_every: float = 0.0,
+        throttle_duration: float = 0.0,
+        retry_after: int = 1,
+        max_ads_per_query: int = 1000,
+        feed_queries: int = 0,
+        seed: int = None,
+    ):
+        self.ad_rate = ad_rate
+        self.ad_rate_skew = ad_rate_skew
+        self.latency_mean = latency_mean
+        self.latency_distribution = latency_distribution
+        self.error_rate = error_rate
+        self.throttle_every = throttle_every
+        self.throttle_duration = throttle_duration
+        self.retry_after = retry_after
+        self.max_ads_per_query = max_ads_per_query
+        self.feed_queries = feed_queries
+        self.random = random.Random(seed)
+
+        self.started_at = time.time()
+        self._ad_ids = itertools.count(3_000_000_000)
+        # query -> ads sorted by date descending, and the time until which ads were generated
+        self._ads: Dict[str, List[dict]] = {}
+        self._generated_until: Dict[str, float] = {}
+        self._ad_rates: Dict[str, float] = {}
+        self._ads_by_id: Dict[str, dict] = {}
+        self.stats = Counter()
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/ads.json", self.handle_ads)
+        app.router.add_get("/ads/{ad_id}.json", self.handle_ad)
+        app.router.add_get("/locations.json", self.handle_locations)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def handle_ads(self, request: web.Request) -> web.Response:
+        failure = await self._simulate(request)
+        if failure is not None:
+            return failure
+
+        query = request.query.get("q", "")
+        page = int(request.query.get("page", 0))
+        size = int(request.query.get("size", 10))
+        min_price = _parse_price(request.query.get("minPrice"))
+        max_price = _parse_price(request.query.get("maxPrice"))
+
+        ads = [
+            ad for ad in (self._get_ads(query) if query else self._get_feed_ads((page + 1) * size))
+            if (min_price is None or ad["price"]["amount"]["value"] >= min_price)
+            and (max_price is None or ad["price"]["amount"]["value"] <= max_price)
+        ]
+        return web.json_response({ADS_KEY: {"value": {"ad": ads[page * size:(page + 1) * size]}}})
+
+    async def handle_ad(self, request: web.Request) -> web.Response:
+        failure = await self._simulate(request)
+        if failure is not None:
+            return failure
+
+        ad = self._ads_by_id.get(request.match_info["ad_id"])
+        if ad is None:
+            return web.json_response({}, status=404)
+
+        return web.json_response({AD_KEY: {"value": ad}})
+
+    async def handle_locations(self, request: web.Request) -> web.Response:
+        failure = await self._simulate(request)
+        if failure is not None:
+            return failure
+
+        query = request.query.get("q", "").casefold()
+        locations = [
+            {
+                "id": location_id,
+                "id-name": {"value": zip_code},
+                "localized-name": {"value": name},
+                "latitude": {"value": latitude},
+                "longitude": {"value": longitude},
+                "regions": {"region": [{"localized-name": {"value": name}}]},
+            }
+            for location_id, zip_code, name, latitude, longitude in LOCATIONS
+            if name.casefold().startswith(query) or zip_code.startswith(query)
+        ]
+        return web.json_response({LOCATIONS_KEY: {"value": {"location": locations}}})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        elapsed = time.time() - self.started_at
+        return web.json_response({
+            **self.stats,
+            "elapsed": elapsed,
+            "requests_per_second": self.stats["requests"] / elapsed if elapsed else 0,
+            "queries": len(self._ads),
+        })
+
+    async def _simulate(self, request: web.Request):
+        """Apply synthetic latency and failures, returns a failure response if one is injected."""
+        self.stats["requests"] += 1
+        await asyncio.sleep(self._get_latency())
+
+        if self._is_throttled():
+            self.stats["throttled"] += 1
+            return web.json_response({}, status=429, headers={"Retry-After": str(self.retry_after)})
+
+        if self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({}, status=503)
+
+        self.stats["ok"] += 1
+        return None
+
+    def _get_latency(self) -> float:
+        if self.latency_mean <= 0:
+            return 0
+        if self.latency_distribution == "constant":
+            return self.latency_mean
+        if self.latency_distribution == "uniform":
+            return self.random.uniform(0, 2 * self.latency_mean)
+        if self.latency_distribution == "lognormal":
+            # Heavy tail with the requested mean
+            sigma = 1.0
+            return self.random.lognormvariate(math.log(self.latency_mean) - sigma ** 2 / 2, sigma)
+        return self.random.expovariate(1 / self.latency_mean)
+
+    def _is_throttled(self) -> bool:
+        if self.throttle_every <= 0 or self.throttle_duration <= 0:
+            return False
+        return (time.time() - self.started_at) % self.throttle_every < self.throttle_duration
+
+    def _get_ads(self, query: str) -> List[dict]:
+        """Generate the ads of a query posted since the last request."""
+        now = time.time()
+        ads = self._ads.setdefault(query, [])
+        generated_until = self._generated_until.get(query)
+        ad_rate = self._get_ad_rate(query)
+        if generated_until is None:
+            # Start every query with a full page of older ads posted at its own rate
+            posted_at = now
+            for _ in range(20):
+                posted_at -= self.random.expovariate(ad_rate) if ad_rate > 0 else self.random.uniform(0, 3600)
+                ads.append(self._create_ad(query, posted_at))
+            generated_until = now
+
+        if ad_rate > 0:
+            posted_at = generated_until + self.random.expovariate(ad_rate)
+            while posted_at <= now:
+                ads.insert(0, self._create_ad(query, posted_at))
+                self.stats["ads_created"] += 1
+                posted_at += self.random.expovariate(ad_rate)
+        self._generated_until[query] = now
+
+        for ad in ads[self.max_ads_per_query:]:
+            self._ads_by_id.pop(ad["id"], None)
+        del ads[self.max_ads_per_query:]
+
+        return ads
+
+    def _get_feed_ads(self, limit: int) -> List[dict]:
+        """Newest ads of all feed queries, sorted by date descending."""
+        ads = [self._get_ads(get_query(i)) for i in range(self.feed_queries)]
+        return list(itertools.islice(heapq.merge(*ads, key=lambda ad: ad["_created_at"], reverse=True), limit))
+
+    def _get_ad_rate(self, query: str) -> float:
+        """Posting rate of a query, lognormally spread around `ad_rate` if `ad_rate_skew` is set."""
+        ad_rate = self._ad_rates.get(query)
+        if ad_rate is None:
+            sigma = self.ad_rate_skew
+            # Keep the mean over all queries at ad_rate
+            ad_rate = self.ad_rate * self.random.lognormvariate(-sigma ** 2 / 2, sigma) if sigma > 0 else self.ad_rate
+            self._ad_rates[query] = ad_rate
+        return ad_rate
+
+    def _create_ad(self, query: str, created_at: float) -> dict:
+        ad_id = str(next(self._ad_ids))
+        # Ads are posted around Berlin, where the benchmark searches are
+        location_id, zip_code, name, _, _ = self.random.choice(LOCATIONS)
+        start_date = datetime.fromtimestamp(created_at, BERLIN_TZ)
+        ad = {
+            "id": ad_id,
+            "_created_at": created_at,
+            "title": {"value": f"{query} #{ad_id}"},
+            "description": {"value": f"Synthetic ad for {query}<br />Posted at {start_date.isoformat()}"},
+            "price": {
+                "currency-iso-code": {"value": {"value": "EUR"}},
+                "amount": {"value": self.random.randint(1, 2000)},
+                "price-type": {"value": self.random.choice(["SPECIFIED_AMOUNT", "PLEASE_CONTACT"])},
+            },
+            "ad-type": {"value": self.random.choice(["OFFERED", "OFFERED", "WANTED"])},
+            "poster-type": {"value": self.random.choice(["PRIVATE", "PRIVATE", "COMMERCIAL"])},
+            "ad-status": {"value": "ACTIVE"},
+            "start-date-time": {"value": _format_date(start_date)},
+            "ad-address": {
+                "state": {"value": name},
+                "zip-code": {"value": zip_code},
+                "latitude": {"value": "52.52"},
+                "longitude": {"value": "13.40"},
+            },
+            "pictures": {"picture": [
+                {"link": [{"rel": "XXL", "href": f"https://img.example.invalid/{ad_id}/{i}.jpg"}]}
+                for i in range(self.random.randint(0, 3))
+            ]},
+            "contact-name": {"value": "Bench Seller"},
+            "user-since-date-time": {"value": _format_date(start_date - timedelta(days=365))},
+            "link": [{"rel": "self-public-website", "href": f"https://www.kleinanzeigen.de/s-anzeige/bench/{ad_id}"}],
+        }
+        self._ads_by_id[ad_id] = ad
+        return ad
+
+
+def _format_date(date: datetime) -> str:
+    # Same format as the real API, e.g. 2025-05-01T10:00:00.000+0200
+    return date.strftime("%Y-%m-%dT%H:%M:%S.") + f"{date.microsecond // 1000:03d}" + date.strftime("%z")
+
+
+def _parse_price(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Fake Kleinanzeigen API for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_api_arguments(parser)
+    return parser
+
+
+def add_api_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--ad-rate", type=float, default=0.05, help="New ads per second and query")
+    parser.add_argument("--ad-rate-skew", type=float, default=0.0, help="Spread of the ad rate between queries (lognormal sigma)")
+    parser.add_argument("--latency-mean", type=float, default=0.05, help="Mean response latency in seconds")
+    parser.add_argument("--latency-distribution", default="exponential", choices=["constant", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--throttle-every", type=float, default=0.0, help="Start a burst of 429 responses every N seconds")
+    parser.add_argument("--throttle-duration", type=float, default=0.0, help="Length of a 429 burst in seconds")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After sent with 429 responses")
+    parser.add_argument("--feed-queries", type=int, default=0, help="Queries whose ads make up the feed served without a query")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def create_api(args: argparse.Namespace) -> FakeKleinanzeigenApi:
+    return FakeKleinanzeigenApi(
+        ad_rate=args.ad_rate,
+        ad_rate_skew=args.ad_rate_skew,
+        latency_mean=args.latency_mean,
+        latency_distribution=args.latency_distribution,
+        error_rate=args.error_rate,
+        throttle_every=args.throttle_every,
+        throttle_duration=args.throttle_duration,
+        retry_after=args.retry_after,
+        feed_queries=args.feed_queries,
+        seed=args.seed,
+    )
+
+
+def main():
+    args = get_parser().parse_args()
+    web.run_app(create_api(args).create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
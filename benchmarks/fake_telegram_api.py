@@ -0,0 +1,209 @@
+"""
+Local stand-in for the Telegram Bot API used for notifier benchmarks.
+
+Serves /bot{token}/{method} like api.telegram.org, so aiogram's Bot can point at it
+with TELEGRAM_API_URL. Messages are rate limited per chat and globally, requests
+over the limits are answered with 429 and a `retry_after` like real flood limits.
+
+Usage:
+    python -m benchmarks.fake_telegram_api --port 8082 --chat-rate 1 --global-rate 30
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+from aiohttp import web
+
+# Methods answered with a message, every other method just succeeds
+MESSAGE_METHODS = {"sendmessage", "sendphoto", "sendmediagroup"}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def take(self, count: int) -> float:
+        """Take `count` tokens, returns 0 on success or how long to wait until they are available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= count:
+            self.tokens -= count
+            return 0.0
+        return (count - self.tokens) / self.rate
+
+
+class FakeTelegramApi:
+    """Synthetic Telegram Bot API with flood limits."""
+
+    def __init__(
+        self,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        global_rate: float = 30.0,
+        global_burst: float = 30.0,
+        latency_mean: float = 0.03,
+        media_latency: float = 0.05,
+        retry_after_min: int = 1,
+        seed: int = None,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = max(1.0, chat_burst)
+        self.global_bucket = TokenBucket(global_rate, max(1.0, global_burst))
+        self.latency_mean = latency_mean
+        self.media_latency = media_latency
+        self.retry_after_min = retry_after_min
+        self.random = random.Random(seed)
+
+        self.started_at = time.time()
+        self._message_ids = itertools.count(1)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self.stats = Counter()
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        data = await self._read_data(request)
+        self.stats["requests"] += 1
+        self.stats[f"method_{method}"] += 1
+
+        if method == "getupdates":
+            await asyncio.sleep(float(data.get("timeout") or 0))
+            return _ok([])
+
+        if method == "getme":
+            return _ok({"id": 1, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"})
+
+        if method not in MESSAGE_METHODS:
+            return _ok(True)
+
+        chat_id = str(data.get("chat_id"))
+        media = json.loads(data["media"]) if method == "sendmediagroup" and data.get("media") else []
+        # A media group counts as one message per photo towards the limits
+        count = max(1, len(media))
+
+        retry_after, scope = self._take(chat_id, count)
+        if retry_after:
+            self.stats["throttled"] += 1
+            self.stats[f"throttled_{scope}"] += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }, status=429)
+
+        await asyncio.sleep(self._get_latency(len(media)))
+        self.stats["messages"] += count
+
+        if method == "sendmediagroup":
+            return _ok([self._create_message(chat_id) for _ in media])
+        return _ok(self._create_message(chat_id, data.get("text")))
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        elapsed = time.time() - self.started_at
+        return web.json_response({
+            **self.stats,
+            "elapsed": elapsed,
+            "messages_per_second": self.stats["messages"] / elapsed if elapsed else 0,
+            "chats": len(self._chat_buckets),
+        })
+
+    def _take(self, chat_id: str, count: int) -> Tuple[int, str]:
+        """Apply the per-chat and global limits, returns the retry_after and the limit that was hit."""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, max(self.chat_burst, count))
+
+        wait = bucket.take(count)
+        if wait:
+            return max(self.retry_after_min, math.ceil(wait)), "chat"
+
+        wait = self.global_bucket.take(count)
+        if wait:
+            # Give the chat its tokens back, the message was not sent
+            bucket.tokens += count
+            return max(self.retry_after_min, math.ceil(wait)), "global"
+
+        return 0, ""
+
+    def _get_latency(self, media_count: int) -> float:
+        latency = self.random.expovariate(1 / self.latency_mean) if self.latency_mean > 0 else 0
+        return latency + media_count * self.media_latency
+
+    def _create_message(self, chat_id: str, text: str = None) -> dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+        }
+        if text is not None:
+            message["text"] = text
+        return message
+
+    @staticmethod
+    async def _read_data(request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        return dict(await request.post())
+
+
+def _ok(result) -> web.Response:
+    return web.json_response({"ok": True, "result": result})
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    add_api_arguments(parser)
+    return parser
+
+
+def add_api_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--chat-rate", type=float, default=1.0, help="Messages per second and chat")
+    parser.add_argument("--chat-burst", type=float, default=3.0, help="Messages a chat can get at once")
+    parser.add_argument("--global-rate", type=float, default=30.0, help="Messages per second over all chats")
+    parser.add_argument("--global-burst", type=float, default=30.0, help="Messages that can be sent at once over all chats")
+    parser.add_argument("--latency-mean", type=float, default=0.03, help="Mean response latency in seconds")
+    parser.add_argument("--media-latency", type=float, default=0.05, help="Extra latency per photo of a media group in seconds")
+    parser.add_argument("--retry-after-min", type=int, default=1, help="Minimum retry_after of flood limit errors")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def create_api(args: argparse.Namespace) -> FakeTelegramApi:
+    return FakeTelegramApi(
+        chat_rate=args.chat_rate,
+        chat_burst=args.chat_burst,
+        global_rate=args.global_rate,
+        global_burst=args.global_burst,
+        latency_mean=args.latency_mean,
+        media_latency=args.media_latency,
+        retry_after_min=args.retry_after_min,
+        seed=args.seed,
+    )
+
+
+def main():
+    args = get_parser().parse_args()
+    web.run_app(create_api(args).create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark of the local filter stage: compiled search filters vs evaluating the
+search constraints directly.
+
+Every batch of parsed ads is checked against the constraints of all searches,
+like one upstream query shared by many searches. Reports evaluated predicates
+per second, time per batch and the share of ads the filters reject (which are
+no longer persisted or sent).
+
+Usage:
+    python -m benchmarks.filter_engine --searches 5000 --batch-size 50 --batches 20
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+from typing import List
+
+from benchmarks.fake_kleinanzeigen_api import FakeKleinanzeigenApi
+
+VOCABULARY = [
+    "iphone", "samsung", "galaxy", "pixel", "128gb", "256gb", "defekt", "neu", "ovp", "rechnung",
+    "fahrrad", "ebike", "rahmen", "shimano", "sofa", "tisch", "stuhl", "lampe", "ikea", "vintage",
+    "lego", "technic", "playstation", "ps5", "controller", "switch", "nintendo", "kamera", "objektiv", "sony",
+]
+
+
+def configure_environment() -> None:
+    """Set required settings, must run before app modules are imported."""
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("ADMIN_USER_IDS", "[]")
+    os.environ.setdefault("KLEINANZEIGEN_AUTH_TOKEN", "benchmark")
+
+
+def create_items(count: int, seed: int) -> list:
+    from app.kleinanzeigen.models import KleinanzeigenItem
+
+    rnd = random.Random(seed)
+    fake_api = FakeKleinanzeigenApi(seed=seed)
+    items = []
+    for _ in range(count):
+        raw_ad = fake_api._create_ad("benchmark", time.time() - rnd.uniform(0, 7 * 24 * 3600))
+        raw_ad["title"]["value"] = " ".join(rnd.sample(VOCABULARY, rnd.randint(2, 6))).title()
+        raw_ad["description"]["value"] = " ".join(rnd.choices(VOCABULARY, k=rnd.randint(5, 30)))
+        items.append(KleinanzeigenItem(raw_ad))
+    return items
+
+
+def create_searches(count: int, seed: int) -> list:
+    from app.db.models import SearchSettings
+    from app.kleinanzeigen.enums import ItemAdType, ItemPosterType
+
+    rnd = random.Random(seed)
+    searches = []
+    for i in range(count):
+        lowest_price = rnd.choice([None, 0, 50, 100])
+        searches.append(SearchSettings(
+            id=f"bench-{i}",
+            user_id=i,
+            lowest_price=lowest_price,
+            highest_price=(lowest_price or 0) + rnd.choice([200, 500, 2000]) if rnd.random() < 0.8 else None,
+            is_picture_required=rnd.random() < 0.2,
+            poster_type=rnd.choice([None, None, ItemPosterType.PRIVATE]),
+            ad_type=rnd.choice([None, ItemAdType.OFFERED]),
+            required_keywords=", ".join(rnd.sample(VOCABULARY, rnd.randint(0, 2))) or None,
+            excluded_keywords=", ".join(rnd.sample(VOCABULARY, rnd.randint(0, 3))) or None,
+            title_pattern=rnd.choice([None, None, None, r"\b(128|256)gb\b", r"^(iphone|samsung)"]),
+            max_ad_age_hours=rnd.choice([None, None, 24, 72]),
+        ))
+    return searches
+
+
+def matches_directly(search, item, now: float) -> bool:
+    """Reference evaluation of the constraints of one search, without compiling anything."""
+    try:
+        amount = float(item.price.amount)
+    except (TypeError, ValueError):
+        amount = None
+    if amount is not None:
+        if search.lowest_price is not None and amount < search.lowest_price:
+            return False
+        if search.highest_price is not None and amount > search.highest_price:
+            return False
+    if search.is_picture_required and not item.pictures:
+        return False
+    if search.poster_type is not None and item.poster_type != search.poster_type:
+        return False
+    if search.ad_type is not None and item.ad_type != search.ad_type:
+        return False
+
+    text = f"{item.title}\n{item.description or ''}".lower()
+    words = set(re.findall(r"\w+", text))
+    required = [keyword.strip() for keyword in (search.required_keywords or "").lower().split(",") if keyword.strip()]
+    if any(keyword not in words for keyword in required):
+        return False
+    excluded = [keyword.strip() for keyword in (search.excluded_keywords or "").lower().split(",") if keyword.strip()]
+    if any(keyword in words for keyword in excluded):
+        return False
+    if search.title_pattern and not re.search(search.title_pattern, item.title, re.IGNORECASE):
+        return False
+    if search.max_ad_age_hours and item.ad_post_date is not None:
+        if now - item.ad_post_date.timestamp() > search.max_ad_age_hours * 3600:
+            return False
+    return True
+
+
+def report(name: str, elapsed: float, batches: int, evaluated: int, matched: int) -> None:
+    print(
+        f"{name:<10} {evaluated / elapsed / 1e6:7.2f}M predicates/s   "
+        f"{elapsed / batches * 1000:8.1f}ms per batch   {1 - matched / evaluated:6.1%} rejected"
+    )
+
+
+def run(args: argparse.Namespace) -> None:
+    configure_environment()
+    from app.services.search_filter import SearchFilterEngine
+
+    searches = create_searches(args.searches, args.seed)
+    batches = [create_items(args.batch_size, args.seed + i) for i in range(args.batches)]
+    evaluated = args.searches * args.batch_size * args.batches
+    print(f"{args.searches} searches, {args.batches} batches of {args.batch_size} ads")
+
+    now = time.time()
+    started_at = time.perf_counter()
+    direct_matched = 0
+    for items in batches:
+        for search in searches:
+            direct_matched += sum(1 for item in items if matches_directly(search, item, now))
+    report("direct", time.perf_counter() - started_at, args.batches, evaluated, direct_matched)
+
+    engine = SearchFilterEngine()
+    started_at = time.perf_counter()
+    compiled_matched = 0
+    for items in batches:
+        items_by_search = engine.filter_items(searches, items, now=now)
+        compiled_matched += sum(len(search_items) for search_items in items_by_search.values())
+    report("compiled", time.perf_counter() - started_at, args.batches, evaluated, compiled_matched)
+
+    if compiled_matched != direct_matched:
+        print(f"Mismatch: compiled filters matched {compiled_matched} ads, direct evaluation {direct_matched}")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local filter engine benchmark")
+    parser.add_argument("--searches", type=int, default=5000, help="Searches sharing every batch")
+    parser.add_argument("--batch-size", type=int, default=50, help="Ads per batch, like one scanned query")
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+if __name__ == "__main__":
+    run(get_parser().parse_args())
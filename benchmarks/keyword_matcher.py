@@ -0,0 +1,89 @@
+"""
+Benchmark of matching a stream of ads against the item names of many searches.
+
+Compares the keyword matcher with checking every search against every ad, and
+times incremental updates of the matcher against rebuilding it.
+
+Usage:
+    python -m benchmarks.keyword_matcher --searches 50000 --ads 2000
+"""
+
+import argparse
+import os
+import random
+import string
+import time
+from types import SimpleNamespace
+from typing import List
+
+
+def configure_environment() -> None:
+    """Set required settings, must run before app modules are imported."""
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("ADMIN_USER_IDS", "[]")
+    os.environ.setdefault("KLEINANZEIGEN_AUTH_TOKEN", "benchmark")
+
+
+def create_vocabulary(size: int, rnd: random.Random) -> List[str]:
+    letters = string.ascii_lowercase + "äöüß"
+    return ["".join(rnd.choices(letters, k=rnd.randint(3, 12))) for _ in range(size)]
+
+
+def pick_words(vocabulary: List[str], count: int, rnd: random.Random) -> List[str]:
+    return rnd.choices(vocabulary, k=count)
+
+
+def run(args: argparse.Namespace) -> None:
+    configure_environment()
+    from app.services.keyword_matcher import KeywordMatcher, tokenize
+
+    rnd = random.Random(args.seed)
+    vocabulary = create_vocabulary(args.vocabulary, rnd)
+    searches = [
+        SimpleNamespace(id=f"bench-{i}", item_name=" ".join(pick_words(vocabulary, rnd.randint(1, 3), rnd)).title())
+        for i in range(args.searches)
+    ]
+    ads = [" ".join(pick_words(vocabulary, rnd.randint(5, args.max_ad_words), rnd)) for _ in range(args.ads)]
+    print(f"{args.searches} searches, {args.ads} ads of up to {args.max_ad_words} words")
+
+    started_at = time.perf_counter()
+    matcher = KeywordMatcher()
+    matcher.sync(searches)
+    build_time = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    matched = sum(len(matcher.match(ad)) for ad in ads)
+    elapsed = time.perf_counter() - started_at
+    print(f"matcher   {args.ads / elapsed:10.0f} ads/s   {matched} matches")
+
+    naive_ads = ads[:max(1, args.ads // 20)]
+    search_terms = [(search.id, frozenset(tokenize(search.item_name))) for search in searches]
+    started_at = time.perf_counter()
+    naive_matched = 0
+    for ad in naive_ads:
+        tokens = set(tokenize(ad))
+        naive_matched += sum(1 for _, terms in search_terms if terms and terms <= tokens)
+    elapsed = time.perf_counter() - started_at
+    print(f"scan all  {len(naive_ads) / elapsed:10.0f} ads/s   {naive_matched} matches in the first {len(naive_ads)} ads")
+
+    changed = rnd.sample(searches, max(1, args.searches // 100))
+    for search in changed:
+        search.item_name = " ".join(pick_words(vocabulary, rnd.randint(1, 3), rnd))
+    started_at = time.perf_counter()
+    matcher.sync(searches[len(searches) // 100:])
+    sync_time = time.perf_counter() - started_at
+    print(f"build {build_time * 1000:.0f}ms, sync after changing and removing 1% of searches {sync_time * 1000:.0f}ms")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Keyword matcher benchmark")
+    parser.add_argument("--searches", type=int, default=50000)
+    parser.add_argument("--ads", type=int, default=2000)
+    parser.add_argument("--max-ad-words", type=int, default=60, help="Words of title and description")
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+if __name__ == "__main__":
+    run(get_parser().parse_args())
@@ -0,0 +1,208 @@
+"""
+Throughput benchmark of NotificationService against the fake Telegram Bot API.
+
+Seeds N users with M pending notifications each, pushes them through
+send_pending_notifications until all are sent and reports messages per second,
+p50/p99 delivery latency (notification created -> sent) and time spent sleeping
+on flood waits.
+
+Needs a migrated PostgreSQL database (DB_* settings) without other active users,
+benchmark rows are deleted afterwards.
+
+Usage:
+    python -m benchmarks.notification_load --users 100 --notifications 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from aiohttp import web
+from loguru import logger
+
+from benchmarks.fake_kleinanzeigen_api import FakeKleinanzeigenApi
+from benchmarks.fake_telegram_api import add_api_arguments, create_api
+
+BENCHMARK_USER_ID_BASE = 9_000_000_000_000
+BENCHMARK_ITEM_PREFIX = "benchmark-"
+
+
+def configure_environment() -> None:
+    """Set required settings, must run before app modules are imported."""
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("ADMIN_USER_IDS", "[]")
+    os.environ.setdefault("KLEINANZEIGEN_AUTH_TOKEN", "benchmark")
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def seed(args: argparse.Namespace) -> None:
+    from sqlalchemy import select
+
+    from app.db.database import async_session
+    from app.db.models import Item, Notification, SearchSettings, User
+
+    rnd = random.Random(args.seed)
+    fake_api = FakeKleinanzeigenApi(seed=args.seed)
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(User.user_id).where(User.is_active == True, User.user_id < BENCHMARK_USER_ID_BASE).limit(1)
+        )
+        if result.first() is not None:
+            raise RuntimeError("Database has active users, run the benchmark against a dedicated database")
+
+        items = []
+        for i in range(args.notifications):
+            raw_data = fake_api._create_ad("benchmark", time.time() - rnd.uniform(0, 600))
+            raw_data.pop("_created_at")
+            raw_data["id"] = f"{BENCHMARK_ITEM_PREFIX}{i}"
+            items.append(Item(id=raw_data["id"], raw_data=raw_data))
+        session.add_all(items)
+
+        for i in range(args.users):
+            user_id = BENCHMARK_USER_ID_BASE + i
+            search = SearchSettings(user_id=user_id, alias=f"benchmark {i}", item_name="benchmark")
+            session.add(User(user_id=user_id, first_name=f"Benchmark {i}", is_active=True))
+            session.add(search)
+            await session.flush()
+            session.add_all([
+                Notification(item_id=item.id, user_id=user_id, search_id=search.id)
+                for item in items
+            ])
+
+        await session.commit()
+
+
+async def get_pending_count() -> int:
+    from sqlalchemy import func, select
+
+    from app.db.database import async_session
+    from app.db.models import Notification
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(func.count()).select_from(Notification).where(
+                Notification.is_sent == False,
+                Notification.user_id >= BENCHMARK_USER_ID_BASE,
+            )
+        )
+        return result.scalar_one()
+
+
+async def get_delivery_latencies() -> list:
+    from sqlalchemy import select
+
+    from app.db.database import async_session
+    from app.db.models import Notification
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(Notification.created_at, Notification.sent_at).where(
+                Notification.is_sent == True,
+                Notification.user_id >= BENCHMARK_USER_ID_BASE,
+            )
+        )
+        return [(sent_at - created_at).total_seconds() for created_at, sent_at in result.all()]
+
+
+async def cleanup() -> None:
+    from sqlalchemy import delete
+
+    from app.db.database import async_session
+    from app.db.models import Item, Notification, SearchSettings, User
+
+    async with async_session() as session:
+        await session.execute(delete(Notification).where(Notification.user_id >= BENCHMARK_USER_ID_BASE))
+        await session.execute(delete(SearchSettings).where(SearchSettings.user_id >= BENCHMARK_USER_ID_BASE))
+        await session.execute(delete(Item).where(Item.id.startswith(BENCHMARK_ITEM_PREFIX)))
+        await session.execute(delete(User).where(User.user_id >= BENCHMARK_USER_ID_BASE))
+        await session.commit()
+
+
+async def run(args: argparse.Namespace) -> None:
+    configure_environment()
+
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from app.db.database import engine
+    from app.services.notification_service import notification_service
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    runner = None
+    fake_api = None
+    api_url = args.api_url
+    if api_url is None:
+        fake_api = create_api(args)
+        runner = web.AppRunner(fake_api.create_app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.port).start()
+        api_url = f"http://127.0.0.1:{args.port}"
+
+    bot = Bot(
+        token=os.environ["BOT_TOKEN"],
+        session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)),
+    )
+
+    try:
+        await cleanup()
+        await seed(args)
+        total = args.users * args.notifications
+
+        started_at = time.monotonic()
+        for cycle in range(args.max_cycles):
+            await notification_service.send_pending_notifications(bot)
+            pending = await get_pending_count()
+            print(f"cycle {cycle + 1}: {total - pending}/{total} sent after {time.monotonic() - started_at:.2f}s")
+            if not pending:
+                break
+        elapsed = time.monotonic() - started_at
+
+        stats = notification_service.get_stats()
+        latencies = await get_delivery_latencies()
+
+        print()
+        print(f"notifications:          {len(latencies)}/{total} sent ({args.users} users x {args.notifications})")
+        print(f"elapsed:                {elapsed:.2f}s")
+        print(f"throughput:             {len(latencies) / elapsed:.1f} notifications/s")
+        if fake_api is not None:
+            print(f"messages:               {fake_api.stats['messages'] / elapsed:.1f} messages/s, {fake_api.stats['throttled']} throttled")
+        print(f"failed attempts:        {stats['failed']}")
+        print(f"flood waits:            {stats['flood_waits']} ({stats['flood_wait_seconds']:.1f}s sleeping)")
+        print(
+            f"delivery latency:       p50 {percentile(latencies, 0.5):.2f}s, "
+            f"p99 {percentile(latencies, 0.99):.2f}s"
+        )
+    finally:
+        await cleanup()
+        await bot.session.close()
+        await engine.dispose()
+        if runner is not None:
+            await runner.cleanup()
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Notification throughput benchmark")
+    parser.add_argument("--api-url", default=None, help="Use an already running fake Bot API instead of starting one")
+    parser.add_argument("--port", type=int, default=8082, help="Port of the in-process fake Bot API")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--notifications", type=int, default=10, help="Pending notifications per user")
+    parser.add_argument("--max-cycles", type=int, default=20, help="Notification cycles to run at most")
+    add_api_arguments(parser)
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(run(get_parser().parse_args()))
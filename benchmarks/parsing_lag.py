@@ -0,0 +1,117 @@
+"""
+Event loop lag benchmark of parsing ads and rendering messages inline vs in a process pool.
+
+A probe task sleeps in short steps and records how late it wakes up, which is
+the delay bot updates would see while the scanner parses ads.
+
+Usage:
+    python -m benchmarks.parsing_lag --batches 200 --batch-size 50 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import List
+
+from benchmarks.fake_kleinanzeigen_api import FakeKleinanzeigenApi
+
+PROBE_INTERVAL = 0.005
+
+
+def configure_environment() -> None:
+    """Set required settings, must run before app modules are imported."""
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("ADMIN_USER_IDS", "[]")
+    os.environ.setdefault("KLEINANZEIGEN_AUTH_TOKEN", "benchmark")
+
+
+def create_raw_ads(count: int, seed: int) -> List[dict]:
+    rnd = random.Random(seed)
+    fake_api = FakeKleinanzeigenApi(seed=seed)
+    raw_ads = []
+    for i in range(count):
+        raw_ad = fake_api._create_ad(f"query {i % 100}", time.time() - rnd.uniform(0, 3600))
+        raw_ad.pop("_created_at")
+        # Real descriptions are long and full of entities and line breaks
+        raw_ad["description"]["value"] = "Sehr gut erhalten &amp; voll funktionsf&auml;hig.<br />" * rnd.randint(10, 40)
+        raw_ads.append(raw_ad)
+    return raw_ads
+
+
+async def probe_lag(lags: List[float]) -> None:
+    while True:
+        started_at = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started_at - PROBE_INTERVAL)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_mode(mode: str, args: argparse.Namespace, raw_ads: List[dict]) -> None:
+    from app.kleinanzeigen.parsing_executor import ParsingExecutor
+
+    executor = ParsingExecutor(mode=mode, max_workers=args.workers, min_batch_size=1)
+    batches = [raw_ads[i:i + args.batch_size] for i in range(0, len(raw_ads), args.batch_size)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def parse_batch(batch: List[dict]) -> None:
+        async with semaphore:
+            # Stands in for fetching the batch
+            await asyncio.sleep(0)
+            items = await executor.parse_items(batch)
+            for raw_ad in batch[:args.messages_per_batch]:
+                executor.render_item_message(raw_ad, "benchmark")
+            assert len(items) == len(batch)
+
+    # Start every worker and import the message builders before measuring
+    warm_up_runs = executor.max_workers if mode == "process" else 1
+    await asyncio.gather(*(executor.parse_items(raw_ads[:1]) for _ in range(warm_up_runs)))
+    executor.render_item_message(raw_ads[0], "benchmark")
+
+    lags = []
+    probe = asyncio.create_task(probe_lag(lags))
+    started_at = time.perf_counter()
+    await asyncio.gather(*(parse_batch(batch) for batch in batches))
+    elapsed = time.perf_counter() - started_at
+    # Let the probe record the last stall
+    await asyncio.sleep(2 * PROBE_INTERVAL)
+    probe.cancel()
+    executor.shutdown()
+
+    print(
+        f"{mode:<8} {len(raw_ads) / elapsed:>9.0f} ads/s   "
+        f"loop lag p50 {percentile(lags, 0.5) * 1000:6.2f}ms  p99 {percentile(lags, 0.99) * 1000:7.2f}ms  "
+        f"max {max(lags) * 1000:7.2f}ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    configure_environment()
+    raw_ads = create_raw_ads(args.batches * args.batch_size, args.seed)
+    print(f"{len(raw_ads)} ads in batches of {args.batch_size}, {args.workers or 'all'} workers")
+
+    for mode in args.modes:
+        await run_mode(mode, args, raw_ads)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Parsing event loop lag benchmark")
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50, help="Ads per batch, like one scanned query")
+    parser.add_argument("--messages-per-batch", type=int, default=2, help="Messages rendered per batch")
+    parser.add_argument("--concurrency", type=int, default=5, help="Batches parsed at once")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes, 0 uses all available cores")
+    parser.add_argument("--modes", nargs="+", default=["inline", "process"], choices=["inline", "process"])
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(run(get_parser().parse_args()))
@@ -0,0 +1,256 @@
+"""
+Load benchmark of the scan pipeline against the fake Kleinanzeigen API.
+
+Runs ParsingWorker cycles over synthetic searches and reports upstream requests
+per second and ad-to-detection latency (time from an ad being posted to the
+scanner handing it over for persisting), overall and for the busiest tenth of
+the queries. Persisting itself is not part of the benchmark, so no database is
+needed.
+
+Usage:
+    python -m benchmarks.scan_load --searches 10000 --queries 1000 --duration 300 --interval 30
+    python -m benchmarks.scan_load --ad-rate 0.01 --ad-rate-skew 2 --no-adaptive-polling
+    python -m benchmarks.scan_load --dispatch cycles
+    python -m benchmarks.scan_load --scan-mode firehose --queries 1000
+    python -m benchmarks.scan_load --api-url http://127.0.0.1:8081 --searches 20000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Set
+
+from aiohttp import web
+from loguru import logger
+
+from benchmarks.fake_kleinanzeigen_api import add_api_arguments, create_api, get_query
+
+
+def configure_environment(args: argparse.Namespace, api_url: str) -> None:
+    """Point the app settings at the fake API, must run before app modules are imported."""
+    os.environ["KLEINANZEIGEN_API_URL"] = api_url
+    os.environ["KLEINANZEIGEN_RATE_LIMIT"] = str(args.rate_limit)
+    os.environ["KLEINANZEIGEN_RATE_LIMIT_BURST"] = str(max(1, int(args.rate_limit)))
+    os.environ["KLEINANZEIGEN_CONCURRENT_REQUESTS_FOR_SCAN"] = str(args.concurrency)
+    os.environ["REQUEST_INTERVAL"] = str(args.interval)
+    os.environ["ADAPTIVE_POLLING"] = str(args.adaptive_polling)
+    os.environ["MIN_REQUEST_INTERVAL"] = str(args.min_interval)
+    os.environ["MAX_REQUEST_INTERVAL"] = str(args.max_interval)
+    os.environ["STAGGERED_SCANS"] = str(args.dispatch == "staggered")
+    os.environ["SCAN_MODE"] = args.scan_mode
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("ADMIN_USER_IDS", "[]")
+    os.environ.setdefault("KLEINANZEIGEN_AUTH_TOKEN", "benchmark")
+
+
+def create_searches(args: argparse.Namespace) -> list:
+    from app.db.models import SearchSettings
+
+    rnd = random.Random(args.seed)
+    searches = []
+    for i in range(args.searches):
+        lowest_price = rnd.choice([0, 0, 50, 100])
+        searches.append(SearchSettings(
+            id=f"bench-{i}",
+            user_id=i,
+            alias=f"bench {i}",
+            item_name=get_query(i % args.queries),
+            lowest_price=lowest_price,
+            highest_price=lowest_price + rnd.choice([200, 500, 2000]),
+            location_id="3331",
+            location_name="Berlin",
+            radius_km=10,
+            is_picture_required=rnd.random() < 0.2,
+            is_active=True,
+            was_used=False,
+        ))
+    return searches
+
+
+class DetectionRecorder:
+    """Replaces persisting of new items and records how late they were detected."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.query_latencies: Dict[str, List[float]] = {}
+        self.seen: Dict[str, Set[str]] = {}
+
+    async def get_unseen_items(self, searches, items_by_search) -> Dict[str, list]:
+        return {
+            search.id: [item for item in items_by_search[search.id] if item.id not in self.seen.get(search.id, ())]
+            for search in searches
+        }
+
+    @staticmethod
+    async def store_items(items) -> None:
+        pass
+
+    async def process_search(self, search, items) -> bool:
+        now = time.time()
+        seen = self.seen.setdefault(search.id, set())
+        for item in items:
+            seen.add(item.id)
+            # The first cycle of a search only records what already exists, like was_used
+            if search.was_used and item.ad_post_date is not None:
+                latency = now - item.ad_post_date.timestamp()
+                self.latencies.append(latency)
+                self.query_latencies.setdefault(search.item_name, []).append(latency)
+        search.was_used = True
+        return True
+
+    @staticmethod
+    async def advance_watermarks(searches, watermark) -> None:
+        for search in searches:
+            search.last_seen_ad_id = watermark.ad_id
+            search.last_seen_ad_at = watermark.ad_at
+
+    def get_busy_latencies(self, share: float = 0.1) -> List[float]:
+        """Latencies of the queries with the most detected ads."""
+        queries = sorted(self.query_latencies.values(), key=len, reverse=True)
+        return [latency for latencies in queries[:max(1, int(len(queries) * share))] for latency in latencies]
+
+
+async def sample_request_rate(rate_limiter, samples: List[int]) -> None:
+    """Record how many requests were sent in every second."""
+    acquired = rate_limiter.stats["acquired"]
+    while True:
+        await asyncio.sleep(1)
+        samples.append(rate_limiter.stats["acquired"] - acquired)
+        acquired = rate_limiter.stats["acquired"]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(args: argparse.Namespace) -> None:
+    runner = None
+    api_url = args.api_url
+    if args.scan_mode == "firehose":
+        # The feed without a query carries the ads of all benchmark queries
+        args.feed_queries = args.queries
+    if api_url is None:
+        runner = web.AppRunner(create_api(args).create_app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.port).start()
+        api_url = f"http://127.0.0.1:{args.port}"
+
+    configure_environment(args, api_url)
+
+    from app.services.scan_dispatcher import scan_dispatcher
+    from app.services.scan_service import scan_service
+    from app.services.search_registry import search_registry
+    from app.workers.parsing_worker import parsing_worker
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    searches = create_searches(args)
+    search_registry.matcher.sync(searches)
+    recorder = DetectionRecorder()
+    scan_service._get_unseen_items = recorder.get_unseen_items
+    scan_service._store_items = recorder.store_items
+    scan_service._process_search = recorder.process_search
+    scan_service._advance_watermarks = recorder.advance_watermarks
+    scan_service.scan_for_new_items = lambda: scan_service.scan_searches(searches)
+
+    async def load_active_searches():
+        return searches
+
+    scan_service.load_active_searches = load_active_searches
+
+    await scan_service.kleinanzeigen_client.start()
+
+    request_rates = []
+    sampler = asyncio.create_task(sample_request_rate(scan_service.kleinanzeigen_client.rate_limiter, request_rates))
+
+    cycle_durations = []
+    started_at = time.monotonic()
+    if args.dispatch == "staggered":
+        dispatcher = asyncio.create_task(scan_dispatcher.run())
+        while time.monotonic() - started_at < args.duration:
+            await asyncio.sleep(min(10, args.duration))
+            print(f"{time.monotonic() - started_at:.0f}s: detected {len(recorder.latencies)} ads so far, {scan_dispatcher.get_stats()}")
+        scan_dispatcher.stop()
+        await dispatcher
+    else:
+        while time.monotonic() - started_at < args.duration:
+            cycle_started_at = time.monotonic()
+            await parsing_worker.run_once()
+            cycle_durations.append(time.monotonic() - cycle_started_at)
+            print(
+                f"cycle {len(cycle_durations)} at {cycle_started_at - started_at:.0f}s: {cycle_durations[-1]:.2f}s, "
+                f"detected {len(recorder.latencies)} ads so far"
+            )
+            await asyncio.sleep(max(0, parsing_worker.interval - cycle_durations[-1]))
+    elapsed = time.monotonic() - started_at
+    sampler.cancel()
+
+    stats = scan_service.get_stats()
+    requests = stats["rate_limiter"]["acquired"]
+    latencies = recorder.latencies
+    busy_latencies = recorder.get_busy_latencies()
+
+    print()
+    print(f"searches:               {args.searches} ({args.queries} distinct queries, {args.scan_mode} mode)")
+    if cycle_durations:
+        print(f"cycles:                 {len(cycle_durations)}, mean duration {statistics.mean(cycle_durations):.2f}s")
+    print(f"upstream requests:      {requests} ({requests / elapsed:.1f} req/s)")
+    if request_rates:
+        print(
+            f"requests per second:    p50 {percentile(request_rates, 0.5)}, p99 {percentile(request_rates, 0.99)}, "
+            f"max {max(request_rates)}, stdev {statistics.pstdev(request_rates):.1f}"
+        )
+    print(
+        f"requests saved:         {stats['planner']['saved_requests']} per scan of all searches by merging "
+        f"({stats['planner']['upstream_requests']} upstream queries)"
+    )
+    if args.scan_mode == "firehose":
+        print(f"routing:                {stats['router']}")
+    print(f"unchanged responses:    {stats['fingerprints']['hits']} hits, {stats['fingerprints']['misses']} misses")
+    print(f"throttled:              {stats['rate_limiter']['throttled']}")
+    print(f"detected ads:           {len(latencies)}")
+    print(
+        f"detection latency:      p50 {percentile(latencies, 0.5):.2f}s, "
+        f"p90 {percentile(latencies, 0.9):.2f}s, p99 {percentile(latencies, 0.99):.2f}s"
+    )
+    print(
+        f"busiest 10% queries:    p50 {percentile(busy_latencies, 0.5):.2f}s, "
+        f"p90 {percentile(busy_latencies, 0.9):.2f}s ({len(busy_latencies)} ads)"
+    )
+    if stats["scheduler"] is not None:
+        print(f"polling intervals:      {stats['scheduler']}")
+
+    await scan_service.kleinanzeigen_client.close()
+    if runner is not None:
+        await runner.cleanup()
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Scan pipeline load benchmark")
+    parser.add_argument("--api-url", default=None, help="Use an already running fake API instead of starting one")
+    parser.add_argument("--port", type=int, default=8081, help="Port of the in-process fake API")
+    parser.add_argument("--searches", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=1_000, help="Number of distinct search queries")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to run scan cycles for")
+    parser.add_argument("--interval", type=int, default=30, help="REQUEST_INTERVAL, the average polling interval")
+    parser.add_argument("--scan-mode", choices=["search", "firehose"], default="search", help="SCAN_MODE")
+    parser.add_argument("--dispatch", choices=["staggered", "cycles"], default="staggered", help="Staggered scans or ParsingWorker cycles")
+    parser.add_argument("--adaptive-polling", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--min-interval", type=int, default=10, help="MIN_REQUEST_INTERVAL")
+    parser.add_argument("--max-interval", type=int, default=900, help="MAX_REQUEST_INTERVAL")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent upstream requests")
+    parser.add_argument("--rate-limit", type=float, default=1000, help="Client rate limit in requests per second")
+    add_api_arguments(parser)
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(run(get_parser().parse_args()))
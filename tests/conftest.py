@@ -0,0 +1,6 @@
+import os
+
+# Settings are read on import of the app packages
+os.environ.setdefault("BOT_TOKEN", "123:test")
+os.environ.setdefault("ADMIN_USER_IDS", "[1]")
+os.environ.setdefault("KLEINANZEIGEN_AUTH_TOKEN", "test")
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from app.services.incremental_fetcher import Watermark
+
+
+def make_raw_ad(ad_id: str, date_str: str) -> dict:
+    return {"id": ad_id, "start-date-time": {"value": date_str}}
+
+
+def test_oldest_picks_earliest_watermark():
+    newer = Watermark("2", datetime(2024, 5, 2))
+    older = Watermark("1", datetime(2024, 5, 1))
+    assert Watermark.oldest([newer, older]) == older
+
+
+def test_oldest_ignores_searches_without_watermark():
+    watermark = Watermark("1", datetime(2024, 5, 1))
+    assert Watermark.oldest([None, watermark, None]) == watermark
+
+
+def test_oldest_without_any_watermark():
+    assert Watermark.oldest([None, None]) is None
+    assert Watermark.oldest([]) is None
+
+
+def test_oldest_prefers_watermark_without_date():
+    undated = Watermark("1", None)
+    assert Watermark.oldest([Watermark("2", datetime(2024, 5, 1)), undated]) == undated
+
+
+def test_is_reached_by_same_ad():
+    watermark = Watermark("42", datetime(2024, 5, 1, 12))
+    assert watermark.is_reached_by(make_raw_ad("42", "2024-05-02T10:00:00.000+0200"))
+
+
+def test_is_reached_by_older_ad():
+    # 12:00 in Berlin is 10:00 UTC, watermarks are naive UTC
+    watermark = Watermark("42", datetime(2024, 5, 1, 10, 30))
+    assert watermark.is_reached_by(make_raw_ad("41", "2024-05-01T12:00:00.000+0200"))
+    assert not watermark.is_reached_by(make_raw_ad("43", "2024-05-01T13:00:00.000+0200"))
+
+
+def test_is_reached_by_ad_without_date():
+    watermark = Watermark("42", datetime(2024, 5, 1))
+    assert not watermark.is_reached_by({"id": "43"})
+    assert not Watermark("42", None).is_reached_by(make_raw_ad("43", "2024-05-01T12:00:00.000+0200"))
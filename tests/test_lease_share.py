@@ -0,0 +1,29 @@
+from app.db.repositories.search_settings_repository import get_lease_changes
+
+
+def test_single_replica_takes_everything():
+    assert get_lease_changes([], total=10, replicas=1) == ([], 10)
+
+
+def test_no_live_replica_counts_as_one():
+    assert get_lease_changes([], total=3, replicas=0) == ([], 3)
+
+
+def test_share_is_rounded_up():
+    # 10 searches between 3 replicas are leased as 4 + 4 + 2
+    assert get_lease_changes(["a", "b"], total=10, replicas=3) == ([], 2)
+
+
+def test_new_replica_makes_others_release():
+    held_ids = ["a", "b", "c", "d", "e", "f"]
+    released_ids, missing = get_lease_changes(held_ids, total=6, replicas=2)
+    assert released_ids == ["d", "e", "f"]
+    assert missing == 0
+
+
+def test_full_share_takes_nothing():
+    assert get_lease_changes(["a", "b", "c"], total=6, replicas=2) == ([], 0)
+
+
+def test_no_active_searches():
+    assert get_lease_changes(["a"], total=0, replicas=2) == (["a"], 0)
@@ -0,0 +1,105 @@
+import pytest
+
+from app.db.models import SearchSettings
+from app.kleinanzeigen.enums import ItemPosterType
+from app.services.search_filter import (
+    MAX_MATCHED_TITLE_LENGTH,
+    MAX_TITLE_PATTERN_LENGTH,
+    ItemFeatures,
+    SearchFilter,
+    compile_title_pattern,
+)
+from app.services.keyword_matcher import TOKEN_PATTERN, normalize
+
+
+def make_features(title: str, description: str = "", amount=None, has_pictures=True, poster_type=None, age=None):
+    text = normalize(f"{title}\n{description}" if description else title)
+    return ItemFeatures(
+        item=None,
+        title=title,
+        text=text,
+        words=frozenset(TOKEN_PATTERN.findall(text)),
+        amount=amount,
+        has_pictures=has_pictures,
+        poster_type=poster_type,
+        ad_type=None,
+        age=age,
+    )
+
+
+@pytest.mark.parametrize("pattern", [
+    r"iphone\s*1[1-5]",
+    r"^(?:neu|ovp)\b",
+    r"\d{2,4}\s?gb",
+    r"a.*b.*",
+    r"(?i)fahrrad(?! kinder)",
+    r"(ab){3}",
+    r"(a|b)+",  # single characters are parsed into a character set
+])
+def test_compile_title_pattern_accepts(pattern):
+    assert compile_title_pattern(pattern).search is not None
+
+
+@pytest.mark.parametrize("pattern, message", [
+    (r"(\w+\s?)*", "nested quantifiers"),
+    (r"(ab|cd)+", "alternatives"),
+    (r"(a)\1", "backreferences"),
+    (r"a.*b.*c.*", "at most"),
+    (r"a{1,50}b+c*", "at most"),
+    (r"(", "invalid"),
+    ("a" * (MAX_TITLE_PATTERN_LENGTH + 1), "longer"),
+])
+def test_compile_title_pattern_rejects(pattern, message):
+    with pytest.raises(ValueError, match=message):
+        compile_title_pattern(pattern)
+
+
+def test_compile_title_pattern_ignores_case():
+    assert compile_title_pattern("iphone").search("Apple IPHONE 13")
+
+
+def test_search_filter_without_constraints_accepts_everything():
+    search_filter = SearchFilter(SearchSettings(id="1"))
+    assert search_filter.checks == []
+    assert search_filter(make_features("anything"))
+
+
+def test_search_filter_price_range_keeps_ads_without_price():
+    search_filter = SearchFilter(SearchSettings(id="1", lowest_price=100, highest_price=200))
+    assert search_filter(make_features("bike", amount=150))
+    assert search_filter(make_features("bike", amount=None))
+    assert not search_filter(make_features("bike", amount=99))
+    assert not search_filter(make_features("bike", amount=201))
+
+
+def test_search_filter_keywords():
+    search_filter = SearchFilter(SearchSettings(
+        id="1", required_keywords="iphone, 128 gb", excluded_keywords="defekt, ohne akku",
+    ))
+    assert search_filter(make_features("iPhone 13", "128 GB, neuwertig"))
+    assert not search_filter(make_features("iPhone 13", "64 GB"))
+    assert not search_filter(make_features("iPhone 13 defekt", "128 GB"))
+    assert not search_filter(make_features("iPhone 13", "128 GB, ohne Akku"))
+
+
+def test_search_filter_pictures_poster_and_age():
+    search_filter = SearchFilter(SearchSettings(
+        id="1", is_picture_required=True, poster_type=ItemPosterType.PRIVATE, max_ad_age_hours=2,
+    ))
+    assert search_filter(make_features("bike", poster_type=ItemPosterType.PRIVATE, age=3600))
+    assert not search_filter(make_features("bike", has_pictures=False, poster_type=ItemPosterType.PRIVATE))
+    assert not search_filter(make_features("bike", poster_type=ItemPosterType.COMMERCIAL))
+    assert not search_filter(make_features("bike", poster_type=ItemPosterType.PRIVATE, age=3 * 3600))
+
+
+def test_search_filter_title_pattern():
+    search_filter = SearchFilter(SearchSettings(id="1", title_pattern=r"iphone\s*1[2-5]"))
+    assert search_filter(make_features("iPhone 13 Pro"))
+    assert not search_filter(make_features("iPhone 11"))
+    # Only the start of long titles is matched
+    assert not search_filter(make_features("x" * MAX_MATCHED_TITLE_LENGTH + " iphone 13"))
+
+
+def test_search_filter_ignores_unsafe_title_pattern():
+    search_filter = SearchFilter(SearchSettings(id="1", title_pattern=r"(\w+\s?)*$"))
+    assert search_filter.checks == []